@@ -2,82 +2,203 @@ import os
 import numpy as np
 
 
-def load_circuit(ROOT_DIR, data_name):
+def load_circuit(ROOT_DIR, data_name, use_cache=True, mmap=False):
+    """
+    Load a circuit dataset from "envs/circuit/circuit_files/{data_name}.txt".
+    The rows are parsed in bulk by numpy and, with use_cache, stored as .npy sidecars
+    ({data_name}.input.npy, {data_name}.output.npy) which are reused while they are newer than the text file
+    and match its sizes. Sidecars are written to a temporary file and moved in place.
+    With mmap, the sidecars are memory-mapped read-only, so processes share the pages of the dataset.
+    Returns:
+        input_data: array of shape (n, input_size).
+        output_data: array of shape (n, output_size).
+    """
     data_file = os.path.join(ROOT_DIR, 'envs', 'circuit', 'circuit_files', f'{data_name}.txt')
-    
-    index = 0
-    input_size = None
-    output_size = None
-    input_data = []
-    output_data = []
+    input_file = os.path.join(ROOT_DIR, 'envs', 'circuit', 'circuit_files', f'{data_name}.input.npy')
+    output_file = os.path.join(ROOT_DIR, 'envs', 'circuit', 'circuit_files', f'{data_name}.output.npy')
+
+    data_mtime = os.path.getmtime(data_file)
+    cache_valid = use_cache and all(
+        os.path.exists(file) and os.path.getmtime(file) >= data_mtime for file in [input_file, output_file])
+
+    mmap_mode = 'r' if mmap else None
+    if cache_valid:
+        try:
+            input_data = np.load(input_file, mmap_mode=mmap_mode)
+            output_data = np.load(output_file, mmap_mode=mmap_mode)
+            input_size, output_size = read_circuit_sizes(data_file)
+            cache_valid = input_data.shape[1:]==(input_size,) and output_data.shape[1:]==(output_size,) and \
+                input_data.shape[0]==output_data.shape[0]
+        except (ValueError, OSError, EOFError):
+            # truncated or broken sidecar
+            cache_valid = False
+
+    if not cache_valid:
+        input_data, output_data = parse_circuit_file(data_file)
+        if not use_cache:
+            return input_data, output_data
+
+        save_sidecar(input_file, input_data)
+        save_sidecar(output_file, output_data)
+        input_data = np.load(input_file, mmap_mode=mmap_mode)
+        output_data = np.load(output_file, mmap_mode=mmap_mode)
 
-    with open(data_file, 'r') as file:
-        for line in file.readlines():
-            line = line.strip()
-            if len(line) == 0:
-                continue
+    return input_data, output_data
+
+
+def save_sidecar(filename, data):
+    # written to a temporary file and moved in place, so an interrupted or concurrent run never leaves a partial sidecar
+    tmp_file = f'{filename}.{os.getpid()}.tmp'
+    with open(tmp_file, 'wb') as f:
+        np.save(f, data)
+    os.replace(tmp_file, filename)
+
+
+def read_size_header(file, data_file):
+    # first two non-empty lines are the input and output sizes
+    sizes = []
+    while len(sizes) < 2:
+        line = file.readline()
+        assert line, f'{data_file} has no size header.'
+        line = line.strip()
+        if len(line) > 0:
+            sizes.append(int(line))
+    return sizes
 
-            elif index == 0:
-                input_size = int(line)
-            elif index == 1:
-                output_size = int(line)
-            else:
-                data = list(map(float, line.split(' ')))
-                assert len(data)==input_size+output_size
+def read_circuit_sizes(data_file):
+    with open(data_file, 'r') as file:
+        return read_size_header(file, data_file)
 
-                input_data.append(data[:input_size])
-                output_data.append(data[input_size:])
+def parse_circuit_file(data_file):
+    with open(data_file, 'r') as file:
+        input_size, output_size = read_size_header(file, data_file)
 
-            index += 1
+        data = np.loadtxt(file, dtype=float, ndmin=2)
 
-    input_data = np.vstack(input_data)
-    output_data = np.vstack(output_data)
+    assert data.shape[1]==input_size+output_size
 
+    input_data = np.ascontiguousarray(data[:, :input_size])
+    output_data = np.ascontiguousarray(data[:, input_size:])
     return input_data, output_data
 
 
 class CircuitEvaluator:
-    def __init__(self, input_data, output_data, error_type='mse'):
+    def __init__(self, input_data, output_data, error_type='mse', batch_size=0, seed=0):
 
         assert error_type in ['mse', 'mae'], 'choise error_type from [mse, mae].'
 
         self.input_data = input_data
         self.output_data = output_data
         self.error_type = error_type
+        # score on a random mini-batch of rows when 0 < batch_size < number of rows
+        self.batch_size = batch_size
+        self.seed = seed
+        self.batch = None
+
+    def __getstate__(self):
+        # memory-mapped data is sent to workers as its file name, not as a copy
+        state = self.__dict__.copy()
+        for attr in ['input_data', 'output_data']:
+            data = state[attr]
+            if isinstance(data, np.memmap) and data.filename is not None and data._mmap is not None:
+                state[attr] = ('memmap', data.filename)
+        return state
+
+    def __setstate__(self, state):
+        for attr in ['input_data', 'output_data']:
+            if isinstance(state[attr], tuple):
+                state[attr] = np.load(state[attr][1], mmap_mode='r')
+        self.__dict__.update(state)
+
+    def get_error(self, output_pred, output_data):
+        # error computed in place on the prediction array
+        np.subtract(output_pred, output_data, out=output_pred)
+        if self.error_type=='mae':
+            np.abs(output_pred, out=output_pred)
+        else:
+            np.square(output_pred, out=output_pred)
+        return np.mean(output_pred)
+
+    def get_batch(self, generation):
+        """
+        Row indices of the mini-batch of the generation, None for the full data.
+        The batch only depends on seed and generation, so every worker scores on the same rows.
+        """
+        if self.batch_size <= 0 or self.batch_size >= self.input_data.shape[0]:
+            return None
+
+        if self.batch is None or self.batch[0] != generation:
+            rng = np.random.default_rng([self.seed, generation])
+            indices = np.sort(rng.choice(self.input_data.shape[0], self.batch_size, replace=False))
+            self.batch = (generation, indices)
+        return self.batch[1]
 
     def evaluate_circuit(self, key, circuit, generation):
 
-        output_pred = []
-        for inp in self.input_data:
-            pred = circuit.activate(inp)
-            output_pred.append(pred)
-
-        output_pred = np.vstack(output_pred)
-        if self.error_type=='mae':
-            error = np.mean(np.abs(self.output_data - output_pred))
+        indices = self.get_batch(generation)
+        if indices is None:
+            input_data, output_data = self.input_data, self.output_data
         else:
-            error = np.mean(np.square(self.output_data - output_pred))
+            input_data, output_data = self.input_data[indices], self.output_data[indices]
+
+        # whole truth table in one forward pass
+        output_pred = circuit.activate_batch(input_data)
+        error = self.get_error(output_pred, output_data)
 
         results = {
             'fitness': 1.0 - error
         }
         return results
 
-    def print_result(self, circuit):
+    def evaluate_circuit_full(self, key, circuit, generation):
+        # fitness on the full data, used to rescore genomes in mini-batch mode
+        output_pred = circuit.activate_batch(self.input_data)
+        error = self.get_error(output_pred, self.output_data)
 
-        output_pred = []
-        for inp, out in zip(self.input_data, self.output_data):
-            pred = circuit.activate(inp)
-            output_pred.append(pred)
+        results = {
+            'fitness': 1.0 - error
+        }
+        return results
 
+    def rescore_elites(self, genomes, groups, elite_num, rescore_function):
+        """
+        In mini-batch mode, replace the fitness of the genomes which survive unchanged by their fitness on the full data:
+        the best elite_num genomes of every group (species) and the best genome of all.
+        Rescoring can change the ranking, so it is repeated until all of them have full-data fitness.
+        The best genome and the termination check then rely on the full data, not on a lucky batch.
+        Parent selection and species fitness still mix full-data fitness of these genomes with
+        mini-batch fitness of the others, which is intended: the others are only compared within the generation.
+        rescore_function(genomes) assigns full-data fitness to a dict of genomes (e.g. in parallel),
+        the mini-batch fitness is kept as batch_fitness.
+        """
+        if self.get_batch(0) is None:
+            return
+
+        groups = [list(group) for group in groups] + [list(genomes.keys())]
+        elite_nums = [elite_num] * (len(groups)-1) + [1]
+
+        rescored = set()
+        while True:
+            targets = {}
+            for group, num in zip(groups, elite_nums):
+                elites = sorted(group, key=lambda key: genomes[key].fitness, reverse=True)[:num]
+                targets.update({key: genomes[key] for key in elites if key not in rescored})
+            if len(targets) == 0:
+                break
+
+            for genome in targets.values():
+                genome.batch_fitness = genome.fitness
+            rescore_function(targets)
+            rescored.update(targets.keys())
+
+    def print_result(self, circuit):
+
+        output_pred = circuit.activate_batch(self.input_data)
+        for inp, out, pred in zip(self.input_data, self.output_data, output_pred):
             print('input: ', inp, end='  ')
             print('label: ', out, end='  ')
             print('predict: ', '[' + ' '.join( map(lambda z: f'{z: =.2f}', pred) ) + ']')
 
-        output_pred = np.vstack(output_pred)
-        if self.error_type=='mae':
-            error = np.mean(np.abs(self.output_data - output_pred))
-        else:
-            error = np.mean(np.square(self.output_data - output_pred))
+        error = self.get_error(output_pred, self.output_data)
 
         print(f'error: {error: =.5f}')
@@ -1,17 +1,23 @@
 import os
+import json
 import numpy as np
 
-from gym_utils import make_vec_envs
+from gym_utils import make_vec_envs, get_cached_env
 
 
 class EvogymControllerEvaluator:
-    def __init__(self, env_id, robot, num_eval=1):
+    def __init__(self, env_id, robot, num_eval=1, reuse_env=True):
         self.env_id = env_id
         self.robot = robot
         self.num_eval = num_eval
+        self.reuse_env = reuse_env
 
     def evaluate_controller(self, key, controller, generation):
-        env = make_vec_envs(self.env_id, self.robot, 0, 1)
+        if self.reuse_env:
+            # built once per worker process, reseeded for each genome
+            env = get_cached_env(self.env_id, self.robot, 0)
+        else:
+            env = make_vec_envs(self.env_id, self.robot, 0, 1)
 
         obs = env.reset()
         episode_scores = []
@@ -23,7 +29,8 @@ class EvogymControllerEvaluator:
                 score = infos[0]['episode']['r']
                 episode_scores.append(score)
 
-        env.close()
+        if not self.reuse_env:
+            env.close()
 
         results = {
             'fitness': np.mean(episode_scores),
@@ -31,14 +38,55 @@ class EvogymControllerEvaluator:
         return results
 
 
-class EvogymControllerEvaluatorNS:
+class EvogymControllerEvaluatorBatch:
+    """
+    Evaluate a chunk of controllers in one process through one in-process vec env, one env per controller.
+    Only the robots which have not finished all their episodes are stepped, so a chunk costs
+    the sum of the episode lengths of its robots, not chunk size x the longest one.
+    Use with EvaluatorParallel(chunk_size=...), results equal those of EvogymControllerEvaluator.
+    """
     def __init__(self, env_id, robot, num_eval=1):
         self.env_id = env_id
         self.robot = robot
         self.num_eval = num_eval
 
+    def evaluate_controllers(self, keys, controllers, generation):
+        num_envs = len(controllers)
+        env = get_cached_env(self.env_id, self.robot, 0, num_envs=num_envs)
+
+        obs = env.reset()
+
+        episode_scores = [[] for _ in range(num_envs)]
+        active = list(range(num_envs))
+        while len(active) > 0:
+            # sub-envs of the DummyVecEnv are stepped one by one, as env.step would, but finished robots are skipped
+            for i in active:
+                action = np.array(controllers[i].activate(obs[i]))*2 - 1
+                observation, _, done, info = env.envs[i].step(action)
+                if done:
+                    observation = env.envs[i].reset()
+                if 'episode' in info:
+                    episode_scores[i].append(info['episode']['r'])
+                obs[i] = observation
+            active = [i for i in active if len(episode_scores[i]) < self.num_eval]
+
+        results = [{'fitness': np.mean(scores)} for scores in episode_scores]
+        return results
+
+
+class EvogymControllerEvaluatorNS:
+    def __init__(self, env_id, robot, num_eval=1, reuse_env=True):
+        self.env_id = env_id
+        self.robot = robot
+        self.num_eval = num_eval
+        self.reuse_env = reuse_env
+
     def evaluate_controller(self, key, controller, generation):
-        env = make_vec_envs(self.env_id, self.robot, 0, 1)
+        if self.reuse_env:
+            # built once per worker process, reseeded for each genome
+            env = get_cached_env(self.env_id, self.robot, 0)
+        else:
+            env = make_vec_envs(self.env_id, self.robot, 0, 1)
 
         obs = env.reset()
 
@@ -69,7 +117,8 @@ class EvogymControllerEvaluatorNS:
                 score = infos[0]['episode']['r']
                 episode_scores.append(score)
 
-        env.close()
+        if not self.reuse_env:
+            env.close()
 
         results = {
             'score': np.mean(episode_scores),
@@ -89,69 +138,195 @@ class EvogymControllerEvaluatorNS:
         return covar
 
 
-from run_ppo import run_ppo
+from run_ppo import run_ppo, run_multi_ppo, make_ppo_config
+
+
+def get_parent_key(genome):
+    # neat_cppn genomes keep parent1 (parent2 for crossover), me_neat genomes keep parent ([-1] if initial)
+    parent = getattr(genome, 'parent1', getattr(genome, 'parent', -1))
+    if isinstance(parent, (list, tuple)):
+        return -1
+    return parent
+
+def get_actuator_map(parent_body, body):
+    """
+    Parent actuator index for each actuator of body, -1 for actuators without a parent counterpart.
+    Actuators are matched by grid position and type, in the row-major order evogym indexes them.
+    """
+    parent_actuators = {tuple(p): i for i,p in enumerate(np.argwhere(np.isin(parent_body, [3,4])))}
+    action_map = []
+    for p in np.argwhere(np.isin(body, [3,4])):
+        i = parent_actuators.get(tuple(p), -1)
+        if i >= 0 and parent_body[tuple(p)] != body[tuple(p)]:
+            i = -1
+        action_map.append(i)
+    return np.array(action_map, dtype=int)
+
+def get_warm_start(parent_key, robot, robot_save_path, controller_save_path):
+    """
+    Controller file and actuator map of the parent robot, (None, None) if the parent has no saved controller.
+    The actuator map is None when the robot has the same body as the parent.
+    """
+    parent_robot = os.path.join(robot_save_path, f'{parent_key}.npz')
+    parent_controller = os.path.join(controller_save_path, f'{parent_key}.pt')
+    if parent_key < 0 or not os.path.exists(parent_robot) or not os.path.exists(parent_controller):
+        return None, None
+
+    parent_body = np.load(parent_robot)['body']
+    if np.array_equal(parent_body, robot['body']):
+        return parent_controller, None
+    return parent_controller, get_actuator_map(parent_body, robot['body'])
 
 class EvogymStructureEvaluator:
-    def __init__(self, env_id, save_path, ppo_iters, eval_interval, deterministic=True):
+    def __init__(self, env_id, save_path, ppo_iters, eval_interval, deterministic=True, warm_start=False, warm_iters=None, skip_trained=False,
+                 early_stop_patience=0, early_stop_min_delta=0.0):
         self.env_id = env_id
         self.save_path = save_path
         self.robot_save_path = os.path.join(save_path, 'robot')
         self.controller_save_path = os.path.join(save_path, 'controller')
+        self.result_save_path = os.path.join(save_path, 'result')
         self.ppo_iters = ppo_iters
         self.eval_interval = eval_interval
         self.deterministic = deterministic
+        # start PPO of a child from its parent's controller, trained for warm_iters when the body is the same
+        # (a changed body gets fresh input layers, so it keeps the full ppo_iters budget)
+        self.warm_start = warm_start
+        self.warm_iters = warm_iters if warm_iters is not None else ppo_iters
+        self.parents = {}
+        # set by SuccessiveHalving: iterations of the current stage, iterations trained before it, and best rewards of robots to continue
+        self.stage_iters = None
+        self.stage_start = 0
+        self.resume = {}
+        # reuse rewards of robots whose training finished before (when resuming a run)
+        self.skip_trained = skip_trained
+        # stop PPO of a robot when its reward plateaus
+        self.ppo_config = make_ppo_config(early_stop_patience=early_stop_patience, early_stop_min_delta=early_stop_min_delta)
 
         os.makedirs(self.robot_save_path, exist_ok=True)
         os.makedirs(self.controller_save_path, exist_ok=True)
-
-    def evaluate_structure(self, key, robot, generation):
+        os.makedirs(self.result_save_path, exist_ok=True)
+
+    def set_parents(self, genomes):
+        # parent keys of the genomes to evaluate, sent to the workers with the evaluator
+        self.parents = {key: get_parent_key(genome) for key, genome in genomes.items()}
+
+    def get_trained_reward(self, key):
+        # reward of a finished training with a saved controller, None if the robot has to be trained
+        # (successive halving stages always train, their budgets differ from the record)
+        if not self.skip_trained or self.stage_iters is not None:
+            return None
+        result_file = os.path.join(self.result_save_path, f'{key}.json')
+        controller_file = os.path.join(self.controller_save_path, f'{key}.pt')
+        if not os.path.exists(result_file) or not os.path.exists(controller_file):
+            return None
+        with open(result_file, 'r') as f:
+            return json.load(f)['reward']
+
+    def save_result(self, key, reward):
+        # written after training finished, moved in place so a crash leaves no partial record
+        result_file = os.path.join(self.result_save_path, f'{key}.json')
+        with open(result_file + '.tmp', 'w') as f:
+            json.dump({'reward': float(reward)}, f)
+        os.replace(result_file + '.tmp', result_file)
+
+    def train_structure(self, key, robot):
+
+        reward = self.get_trained_reward(key)
+        if reward is not None:
+            return reward
 
         file_robot = os.path.join(self.robot_save_path, f'{key}')
         file_controller = os.path.join(self.controller_save_path, f'{key}')
         np.savez(file_robot, **robot)
 
+        init_file, action_map = None, None
+        best_reward = float('-inf')
+        train_iters = self.ppo_iters
+        if key in self.resume:
+            # continue from the robot's own best controller
+            init_file = file_controller + '.pt'
+            best_reward = self.resume[key]
+        elif self.warm_start:
+            init_file, action_map = get_warm_start(self.parents.get(key, -1), robot, self.robot_save_path, self.controller_save_path)
+            if init_file is not None and action_map is None:
+                train_iters = self.warm_iters
+
+        start_iter, schedule_iters = 0, None
+        if self.stage_iters is not None:
+            # stages continue one learning rate schedule over the full ppo_iters
+            train_iters = self.stage_iters
+            start_iter, schedule_iters = self.stage_start, self.ppo_iters
+
         reward = run_ppo(
             env_id=self.env_id,
             robot=robot,
-            train_iters=self.ppo_iters,
+            train_iters=train_iters,
             eval_interval=self.eval_interval,
             save_file=file_controller,
-            deterministic=self.deterministic
+            config=self.ppo_config,
+            deterministic=self.deterministic,
+            init_file=init_file,
+            action_map=action_map,
+            best_reward=best_reward,
+            start_iter=start_iter,
+            schedule_iters=schedule_iters
         )
+        self.save_result(key, reward)
+        return reward
+
+    def evaluate_structure(self, key, robot, generation):
+
+        reward = self.train_structure(key, robot)
 
         results = {
             'fitness': reward,
         }
         return results
 
-class EvogymStructureEvaluatorME:
-    def __init__(self, env_id, save_path, ppo_iters, eval_interval, bd_dictionary, deterministic=True):
-        self.env_id = env_id
-        self.save_path = save_path
-        self.robot_save_path = os.path.join(save_path, 'robot')
-        self.controller_save_path = os.path.join(save_path, 'controller')
-        self.ppo_iters = ppo_iters
-        self.eval_interval = eval_interval
-        self.bd_dictionary = bd_dictionary
-        self.deterministic = deterministic
+    def train_structures(self, keys, robots):
+        # controllers of several robots trained together by run_multi_ppo (no warm start or resume)
+        rewards = [self.get_trained_reward(key) for key in keys]
+        train_indices = [i for i, reward in enumerate(rewards) if reward is None]
+        if len(train_indices) == 0:
+            return rewards
 
-        os.makedirs(self.robot_save_path, exist_ok=True)
-        os.makedirs(self.controller_save_path, exist_ok=True)
-
-    def evaluate_structure(self, key, robot, generation):
-
-        file_robot = os.path.join(self.robot_save_path, f'{key}')
-        file_controller = os.path.join(self.controller_save_path, f'{key}')
-        np.savez(file_robot, **robot)
+        save_files = []
+        for i in train_indices:
+            np.savez(os.path.join(self.robot_save_path, f'{keys[i]}'), **robots[i])
+            save_files.append(os.path.join(self.controller_save_path, f'{keys[i]}'))
 
-        reward = run_ppo(
+        trained_rewards = run_multi_ppo(
             env_id=self.env_id,
-            robot=robot,
+            robots=[robots[i] for i in train_indices],
             train_iters=self.ppo_iters,
             eval_interval=self.eval_interval,
-            save_file=file_controller,
+            save_files=save_files,
+            config=self.ppo_config,
             deterministic=self.deterministic
         )
+        for i, reward in zip(train_indices, trained_rewards):
+            self.save_result(keys[i], reward)
+            rewards[i] = reward
+        return rewards
+
+    def evaluate_structures(self, keys, robots, generation):
+
+        rewards = self.train_structures(keys, robots)
+
+        results_list = [{'fitness': reward} for reward in rewards]
+        return results_list
+
+class EvogymStructureEvaluatorME(EvogymStructureEvaluator):
+    def __init__(self, env_id, save_path, ppo_iters, eval_interval, bd_dictionary, deterministic=True, warm_start=False, warm_iters=None, skip_trained=False,
+                 early_stop_patience=0, early_stop_min_delta=0.0):
+        super().__init__(env_id, save_path, ppo_iters, eval_interval,
+            deterministic=deterministic, warm_start=warm_start, warm_iters=warm_iters, skip_trained=skip_trained,
+            early_stop_patience=early_stop_patience, early_stop_min_delta=early_stop_min_delta)
+        self.bd_dictionary = bd_dictionary
+
+    def evaluate_structure(self, key, robot, generation):
+
+        reward = self.train_structure(key, robot)
         bd = {bd_name: bd_func.evaluate(robot) for bd_name,bd_func in self.bd_dictionary.items()}
 
         results = {
@@ -159,3 +334,69 @@ class EvogymStructureEvaluatorME:
             'bd': bd
         }
         return results
+
+    def evaluate_structures(self, keys, robots, generation):
+
+        rewards = self.train_structures(keys, robots)
+
+        results_list = []
+        for reward, robot in zip(rewards, robots):
+            bd = {bd_name: bd_func.evaluate(robot) for bd_name,bd_func in self.bd_dictionary.items()}
+            results_list.append({'fitness': reward, 'bd': bd})
+        return results_list
+
+
+class SuccessiveHalving:
+    """
+    Generation level PPO budget allocation for structure evaluators.
+    Every new robot is trained for min_iters, then only the best 1/eta of them continue training
+    from their own best controller, with the budget multiplied by eta each stage up to ppo_iters.
+    The learning rate schedule is the one of a full ppo_iters training, continued from stage to stage.
+    A robot's fitness is its best reward at the budget it reached, kept as ppo_iters on the genome.
+    """
+    def __init__(self, parallel, evaluator, min_iters, eta=2):
+        self.parallel = parallel
+        self.evaluator = evaluator
+        self.eta = eta
+
+        # cumulative budgets, rounded up to the evaluation interval
+        interval = evaluator.eval_interval
+        budget = max(interval, (min_iters + interval - 1) // interval * interval)
+        self.budgets = []
+        while budget < evaluator.ppo_iters:
+            self.budgets.append(budget)
+            budget = (budget * eta + interval - 1) // interval * interval
+        self.budgets.append(evaluator.ppo_iters)
+
+    def evaluate(self, genomes, config, generation):
+        self.evaluator.set_parents(genomes)
+
+        candidates = {key: genome for key, genome in genomes.items() if getattr(genome, 'fitness', None) is None}
+        trained = 0
+        self.evaluator.resume = {}
+        for stage, budget in enumerate(self.budgets):
+            if len(candidates) == 0:
+                break
+
+            self.evaluator.stage_iters = budget - trained
+            self.evaluator.stage_start = trained
+            self.parallel.evaluate(candidates, config, generation)
+            for genome in candidates.values():
+                genome.ppo_iters = budget
+            print(f'successive halving stage {stage}: {len(candidates)} robots trained to {budget} iterations')
+
+            trained = budget
+            if stage == len(self.budgets) - 1:
+                break
+
+            num_survivors = len(candidates) // self.eta
+            survivors = sorted(candidates.items(), key=lambda z: z[1].fitness, reverse=True)[:num_survivors]
+            candidates = dict(survivors)
+
+            self.evaluator.resume = {key: genome.fitness for key, genome in candidates.items()}
+            for genome in candidates.values():
+                genome.fitness = None
+
+        self.evaluator.stage_iters = None
+        self.evaluator.stage_start = 0
+        self.evaluator.resume = {}
@@ -3,7 +3,6 @@ import pickle
 import json
 from gym import Env
 import numpy as np
-import torch
 
 import matplotlib.pyplot as plt
 from PIL import Image
@@ -12,7 +11,7 @@ from pygifsicle import gifsicle
 
 from gym_utils import make_vec_envs
 
-from ppo import Policy
+from numpy_policy import NumpyPolicy
 
 
 RenderPaddings = {
@@ -87,8 +86,7 @@ def make_gif(filename, env, viewer, controller, controller_type, padding, track=
         if controller_type=='NEAT':
             action = [np.array(controller.activate(obs[0]))*2 - 1]
         elif controller_type=='PPO':
-            with torch.no_grad():
-                action = controller.predict(obs, deterministic=deterministic)
+            action = controller.predict(obs, deterministic=deterministic)
         else:
             return
         obs, _, done, infos = env.step(action)
@@ -159,8 +157,7 @@ def make_jpg(filename, env, viewer, controller, controller_type, padding, interv
         if controller_type=='NEAT':
             action = [np.array(controller.activate(obs[0]))*2 - 1]
         elif controller_type=='PPO':
-            with torch.no_grad():
-                action = controller.predict(obs, deterministic=deterministic)
+            action = controller.predict(obs, deterministic=deterministic)
         else:
             return
         obs, _, done, infos = env.step(action)
@@ -274,16 +271,11 @@ class EvogymControllerDrawerPPO:
         if not self.overwrite and os.path.exists(filename):
             return
 
-        env = make_vec_envs(self.env_id, self.robot, 0, 1, allow_early_resets=False, vecnormalize=True)
+        env = make_vec_envs(self.env_id, self.robot, 0, 1, allow_early_resets=False)
         viewer = env.get_attr("default_viewer", indices=None)[0]
 
 
-        controller = Policy(env.observation_space, env.action_space, device='cpu')
-        params, obs_rms = torch.load(ppo_file)
-        controller.load_state_dict(params)
-
-        env.training = False
-        env.obs_rms = obs_rms
+        controller = NumpyPolicy.load(ppo_file)
 
         if self.save_type=='gif':
             make_gif(filename, env, viewer, controller, 'PPO', self.padding, **self.draw_kwargs)
@@ -319,15 +311,10 @@ class EvogymStructureDrawerCPPN:
 
         robot = np.load(robot_file)
 
-        env = make_vec_envs(self.env_id, robot, 0, 1, allow_early_resets=False, vecnormalize=True)
+        env = make_vec_envs(self.env_id, robot, 0, 1, allow_early_resets=False)
         viewer = env.get_attr("default_viewer", indices=None)[0]
 
-        controller = Policy(env.observation_space, env.action_space, device='cpu')
-        params, obs_rms = torch.load(ppo_file)
-        controller.load_state_dict(params)
-
-        env.training = False
-        env.obs_rms = obs_rms
+        controller = NumpyPolicy.load(ppo_file)
 
         if self.save_type=='gif':
             make_gif(filename, env, viewer, controller, 'PPO', self.padding, **self.draw_kwargs)
@@ -365,15 +352,10 @@ class EvogymDrawerPOET:
 
         terrain = json.load(open(terrain_file, 'r'))
         env_kwargs = dict(**self.robot, terrain=terrain)
-        env = make_vec_envs(self.env_id, env_kwargs, 0, 1, allow_early_resets=False, vecnormalize=True)
+        env = make_vec_envs(self.env_id, env_kwargs, 0, 1, allow_early_resets=False)
         viewer = env.get_attr("default_viewer", indices=None)[0]
 
-        controller = Policy(env.observation_space, env.action_space, device='cpu')
-        params, obs_rms = torch.load(core_file)
-        controller.load_state_dict(params)
-
-        env.training = False
-        env.obs_rms = obs_rms
+        controller = NumpyPolicy.load(core_file)
 
         if self.save_type=='gif':
             make_gif(filename, env, viewer, controller, 'PPO', self.padding, **self.draw_kwargs)
@@ -1,10 +1,16 @@
 import os
+import sys
+import atexit
 import gym
 import numpy as np
+import multiprocessing as mp
 import multiprocessing.pool
+from multiprocessing import shared_memory, resource_tracker
 
 from stable_baselines3.common.monitor import Monitor
-from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+from stable_baselines3.common.env_util import is_wrapped
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecEnv
+from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper
 from stable_baselines3.common.vec_env.vec_normalize import VecNormalize
 
 def make_env(env_id, env_kwargs, seed, allow_early_resets=True):
@@ -17,10 +23,200 @@ def make_env(env_id, env_kwargs, seed, allow_early_resets=True):
         return env
     return _init
 
-def make_vec_envs(env_id, env_kwargs, seed, num_processes, gamma=None, vecnormalize=False, subproc=True, allow_early_resets=True):
+def _get_buffer_arrays(blocks, num_envs, observation_space, action_space):
+    # numpy views of the shared observation, action, reward and done arrays
+    layout = [
+        (num_envs, *observation_space.shape, observation_space.dtype),
+        (num_envs, *action_space.shape, action_space.dtype),
+        (num_envs, np.float64),
+        (num_envs, np.bool_),
+    ]
+    return [np.ndarray(shape, dtype=dtype, buffer=block.buf) for block, (*shape, dtype) in zip(blocks, layout)]
+
+def _attach_shared_memory(name):
+    # the main process owns and unlinks the blocks, the resource tracker must not unlink them when a worker exits
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    block = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(block._name, 'shared_memory')
+    return block
+
+def _shared_memory_worker(remote, parent_remote, env_fn_wrapper, index, num_envs):
+    parent_remote.close()
+    env = env_fn_wrapper.var()
+    blocks, arrays = [], []
+    while True:
+        try:
+            cmd, data = remote.recv()
+            if cmd == 'step':
+                obs, actions, rewards, dones = arrays
+                observation, reward, done, info = env.step(actions[index])
+                if done:
+                    info['terminal_observation'] = observation
+                    observation = env.reset()
+                obs[index] = observation
+                rewards[index] = reward
+                dones[index] = done
+                # only non-empty infos go through the pipe
+                remote.send(info if len(info) > 0 else None)
+            elif cmd == 'reset':
+                arrays[0][index] = env.reset()
+                remote.send(None)
+            elif cmd == 'seed':
+                remote.send(env.seed(data))
+            elif cmd == 'close':
+                env.close()
+                remote.close()
+                break
+            elif cmd == 'get_spaces':
+                remote.send((env.observation_space, env.action_space))
+            elif cmd == 'attach':
+                blocks = [_attach_shared_memory(name) for name in data]
+                arrays = _get_buffer_arrays(blocks, num_envs, env.observation_space, env.action_space)
+                remote.send(None)
+            elif cmd == 'env_method':
+                method = getattr(env, data[0])
+                remote.send(method(*data[1], **data[2]))
+            elif cmd == 'get_attr':
+                remote.send(getattr(env, data))
+            elif cmd == 'set_attr':
+                remote.send(setattr(env, data[0], data[1]))
+            elif cmd == 'is_wrapped':
+                remote.send(is_wrapped(env, data))
+            else:
+                raise NotImplementedError(f'`{cmd}` is not implemented in the worker')
+        except EOFError:
+            break
+    obs = actions = rewards = dones = arrays = None
+    for block in blocks:
+        block.close()
+
+
+class SharedMemoryVecEnv(VecEnv):
+    """
+    Subprocess vec env like SubprocVecEnv, but actions, observations, rewards and dones are
+    exchanged through preallocated shared memory arrays. Pipes only carry commands and the
+    infos that are not empty (episode statistics, terminal observations).
+    """
+    def __init__(self, env_fns, start_method=None):
+        self.waiting = False
+        self.closed = False
+        num_envs = len(env_fns)
+
+        if start_method is None:
+            start_method = 'forkserver' if 'forkserver' in mp.get_all_start_methods() else 'spawn'
+        ctx = mp.get_context(start_method)
+
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(num_envs)])
+        self.processes = []
+        for index, (work_remote, remote, env_fn) in enumerate(zip(self.work_remotes, self.remotes, env_fns)):
+            args = (work_remote, remote, CloudpickleWrapper(env_fn), index, num_envs)
+            process = ctx.Process(target=_shared_memory_worker, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        self.remotes[0].send(('get_spaces', None))
+        observation_space, action_space = self.remotes[0].recv()
+        assert isinstance(observation_space, gym.spaces.Box), 'shared memory vec env needs Box observations'
+        assert isinstance(action_space, gym.spaces.Box), 'shared memory vec env needs Box actions'
+
+        sizes = [
+            num_envs * int(np.prod(observation_space.shape)) * np.dtype(observation_space.dtype).itemsize,
+            num_envs * int(np.prod(action_space.shape)) * np.dtype(action_space.dtype).itemsize,
+            num_envs * np.dtype(np.float64).itemsize,
+            num_envs,
+        ]
+        self.blocks = [shared_memory.SharedMemory(create=True, size=size) for size in sizes]
+        self.obs, self.actions, self.rewards, self.dones = _get_buffer_arrays(self.blocks, num_envs, observation_space, action_space)
+        for remote in self.remotes:
+            remote.send(('attach', [block.name for block in self.blocks]))
+        for remote in self.remotes:
+            remote.recv()
+        if sys.version_info < (3, 13):
+            # workers share the resource tracker of this process, their unregister also dropped its record
+            for block in self.blocks:
+                resource_tracker.register(block._name, 'shared_memory')
+
+        VecEnv.__init__(self, num_envs, observation_space, action_space)
+
+    def step_async(self, actions):
+        self.actions[:] = np.reshape(actions, self.actions.shape)
+        for remote in self.remotes:
+            remote.send(('step', None))
+        self.waiting = True
+
+    def step_wait(self):
+        infos = [remote.recv() for remote in self.remotes]
+        self.waiting = False
+        infos = [{} if info is None else info for info in infos]
+        return self.obs.copy(), self.rewards.copy(), self.dones.copy(), infos
+
+    def reset(self):
+        for remote in self.remotes:
+            remote.send(('reset', None))
+        for remote in self.remotes:
+            remote.recv()
+        return self.obs.copy()
+
+    def seed(self, seed=None):
+        for i, remote in enumerate(self.remotes):
+            remote.send(('seed', None if seed is None else seed + i))
+        return [remote.recv() for remote in self.remotes]
+
+    def close(self):
+        if self.closed:
+            return
+        if self.waiting:
+            for remote in self.remotes:
+                remote.recv()
+        for remote in self.remotes:
+            remote.send(('close', None))
+        for process in self.processes:
+            process.join()
+        # drop the views before releasing the buffers
+        self.obs = self.actions = self.rewards = self.dones = None
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.closed = True
+
+    def _get_target_remotes(self, indices):
+        indices = self._get_indices(indices)
+        return [self.remotes[i] for i in indices]
+
+    def get_attr(self, attr_name, indices=None):
+        target_remotes = self._get_target_remotes(indices)
+        for remote in target_remotes:
+            remote.send(('get_attr', attr_name))
+        return [remote.recv() for remote in target_remotes]
+
+    def set_attr(self, attr_name, value, indices=None):
+        target_remotes = self._get_target_remotes(indices)
+        for remote in target_remotes:
+            remote.send(('set_attr', (attr_name, value)))
+        for remote in target_remotes:
+            remote.recv()
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        target_remotes = self._get_target_remotes(indices)
+        for remote in target_remotes:
+            remote.send(('env_method', (method_name, method_args, method_kwargs)))
+        return [remote.recv() for remote in target_remotes]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        target_remotes = self._get_target_remotes(indices)
+        for remote in target_remotes:
+            remote.send(('is_wrapped', wrapper_class))
+        return [remote.recv() for remote in target_remotes]
+
+
+def make_vec_envs(env_id, env_kwargs, seed, num_processes, gamma=None, vecnormalize=False, subproc=True, allow_early_resets=True, shared_memory=False):
     envs = [make_env(env_id, env_kwargs, seed+i, allow_early_resets=allow_early_resets) for i in range(num_processes)]
 
-    if subproc and num_processes > 1:
+    if subproc and num_processes > 1 and shared_memory:
+        envs = SharedMemoryVecEnv(envs)
+    elif subproc and num_processes > 1:
         envs = SubprocVecEnv(envs)
     else:
         envs = DummyVecEnv(envs)
@@ -34,6 +230,39 @@ def make_vec_envs(env_id, env_kwargs, seed, num_processes, gamma=None, vecnormal
     return envs
 
 
+# single-process envs of this process, kept across evaluations of the same (env_id, robot)
+_cached_envs = {}
+
+def get_env_key(env_id, env_kwargs):
+    items = []
+    for name, value in sorted(env_kwargs.items()):
+        if isinstance(value, np.ndarray):
+            value = (value.shape, str(value.dtype), value.tobytes())
+        items.append((name, value))
+    return (env_id, tuple(items))
+
+def get_cached_env(env_id, env_kwargs, seed, num_envs=1):
+    """
+    Return an in-process vec env of num_envs copies of (env_id, env_kwargs), built on the first call
+    in this process and reused afterwards. Every copy is re-seeded with the same seed every call,
+    so the next reset starts the same as a newly made 1-process env with that seed.
+    """
+    key = (get_env_key(env_id, env_kwargs), num_envs)
+    env = _cached_envs.get(key, None)
+    if env is None:
+        env = make_vec_envs(env_id, env_kwargs, seed, num_envs, subproc=False)
+        _cached_envs[key] = env
+    env.env_method('seed', seed)
+    return env
+
+def close_cached_envs():
+    for env in _cached_envs.values():
+        env.close()
+    _cached_envs.clear()
+
+atexit.register(close_cached_envs)
+
+
 from evogym import is_connected, has_actuator, get_full_connectivity
 
 def load_robot(ROOT_DIR, robot_name, task=None):
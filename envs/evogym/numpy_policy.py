@@ -0,0 +1,78 @@
+import numpy as np
+
+
+class NumpyPolicy:
+    """
+    Inference copy of a trained ppo.Policy with its observation normalizer, in plain numpy.
+    Takes raw observations (not from VecNormalize), normalizes them as VecNormalize does,
+    and computes the mean action of the actor network. Saved as .npz, so it can be loaded
+    without torch or stable-baselines3.
+    """
+    def __init__(self, params, obs_mean=None, obs_var=None, clip_obs=10.0, epsilon=1e-8):
+        self.weights = [
+            np.asarray(params['mlp_extractor.policy_net.0.weight'], dtype=np.float32).T,
+            np.asarray(params['mlp_extractor.policy_net.2.weight'], dtype=np.float32).T,
+            np.asarray(params['action_net.weight'], dtype=np.float32).T,
+        ]
+        self.biases = [
+            np.asarray(params['mlp_extractor.policy_net.0.bias'], dtype=np.float32),
+            np.asarray(params['mlp_extractor.policy_net.2.bias'], dtype=np.float32),
+            np.asarray(params['action_net.bias'], dtype=np.float32),
+        ]
+        self.log_std = np.asarray(params['log_std'], dtype=np.float32)
+
+        self.obs_mean = None if obs_mean is None else np.asarray(obs_mean, dtype=np.float64)
+        self.obs_std = None if obs_var is None else np.sqrt(np.asarray(obs_var, dtype=np.float64) + epsilon)
+        self.clip_obs = clip_obs
+
+    @classmethod
+    def from_state_dict(cls, state_dict, obs_rms=None, clip_obs=10.0, epsilon=1e-8):
+        params = {name: value.detach().cpu().numpy() for name, value in state_dict.items()}
+        if obs_rms is None:
+            return cls(params, clip_obs=clip_obs, epsilon=epsilon)
+        return cls(params, obs_rms.mean, obs_rms.var, clip_obs=clip_obs, epsilon=epsilon)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Load a policy saved by save, or a controller file of run_ppo ([state_dict, obs_rms], needs torch).
+        """
+        if not filename.endswith('.npz'):
+            import torch
+            state_dict, obs_rms = torch.load(filename)
+            return cls.from_state_dict(state_dict, obs_rms)
+
+        data = np.load(filename)
+        params = {name[len('param/'):]: data[name] for name in data.files if name.startswith('param/')}
+        obs_mean = data['obs_mean'] if 'obs_mean' in data.files else None
+        policy = cls(params, obs_mean, clip_obs=float(data['clip_obs']))
+        if 'obs_std' in data.files:
+            policy.obs_std = data['obs_std']
+        return policy
+
+    def save(self, filename):
+        names = ['mlp_extractor.policy_net.0', 'mlp_extractor.policy_net.2', 'action_net']
+        arrays = {'log_std': self.log_std}
+        for name, weight, bias in zip(names, self.weights, self.biases):
+            arrays[f'{name}.weight'] = weight.T
+            arrays[f'{name}.bias'] = bias
+        arrays = {f'param/{name}': value for name, value in arrays.items()}
+        arrays['clip_obs'] = np.array(self.clip_obs)
+        if self.obs_mean is not None:
+            arrays['obs_mean'] = self.obs_mean
+            arrays['obs_std'] = self.obs_std
+        np.savez(filename, **arrays)
+
+    def normalize(self, obs):
+        if self.obs_mean is None:
+            return obs
+        return np.clip((obs - self.obs_mean) / self.obs_std, -self.clip_obs, self.clip_obs)
+
+    def predict(self, obs, deterministic=True):
+        x = np.asarray(self.normalize(obs), dtype=np.float32).reshape(-1, self.weights[0].shape[0])
+        x = np.tanh(x @ self.weights[0] + self.biases[0])
+        x = np.tanh(x @ self.weights[1] + self.biases[1])
+        actions = x @ self.weights[2] + self.biases[2]
+        if not deterministic:
+            actions = actions + np.exp(self.log_std) * np.random.randn(*actions.shape).astype(np.float32)
+        return actions
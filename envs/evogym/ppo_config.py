@@ -14,4 +14,12 @@ vf_coef         = 0.5
 max_grad_norm   = 0.5
 lr_decay        = True
 gae_lambda      = 0.95
-init_log_std    = 0.1
\ No newline at end of file
+init_log_std    = 0.1
+
+# exchange rollout steps with env processes through shared memory instead of pipes
+shared_memory   = False
+
+# early stopping, patience is counted in evaluations (0 never stops on plateau)
+early_stop_patience = 0
+early_stop_min_delta = 0.0
+max_log_std     = 2.0
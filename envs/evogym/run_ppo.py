@@ -1,21 +1,29 @@
 import os
 import csv
 import time
+from types import SimpleNamespace
 import numpy as np
 import torch
 
-from ppo import Policy, PPO
+from ppo import Policy, PPO, MultiPolicy, MultiPPO
 
 from gym_utils import make_vec_envs
+from numpy_policy import NumpyPolicy
 import ppo_config as default_config
 
+def make_ppo_config(**kwargs):
+    # values of ppo_config with the given ones replaced, picklable to send to workers
+    params = {key: value for key, value in vars(default_config).items() if not key.startswith('_')}
+    params.update(kwargs)
+    return SimpleNamespace(**params)
+
+
 def evaluate(policy, envs, num_eval=1, deterministic=True):
 
     obs = envs.reset()
     episode_rewards = []
     while len(episode_rewards) < num_eval:
-        with torch.no_grad():
-            action = policy.predict(obs, deterministic=deterministic)
+        action = policy.predict(obs, deterministic=deterministic)
         obs, _, done, infos = envs.step(action)
 
         for info in infos:
@@ -24,15 +32,55 @@ def evaluate(policy, envs, num_eval=1, deterministic=True):
     return np.mean(episode_rewards)
 
 
-def run_ppo(env_id, robot, train_iters, eval_interval, save_file, config=None, deterministic=True, save_iter=False, history_file=None):
+# first layers of the policy and value networks, their inputs are observations
+INPUT_LAYERS = ('mlp_extractor.policy_net.0.', 'mlp_extractor.value_net.0.')
+
+def load_warm_start(policy, obs_rms, init_file, action_map=None):
+    """
+    Initialize policy parameters and observation normalizer from a saved controller (e.g. of the parent robot).
+    action_map (parent actuator index for each actuator, -1 for new actuators) is given for a different body:
+    action dimensions are copied through it, and hidden layers and value head are copied as is.
+    Evogym observations are laid out by point mass, so every input after a changed voxel is shifted,
+    and the input layers and observation normalizer are left at their fresh initialization.
+    Without action_map (same body) everything is copied.
+    """
+    params, init_obs_rms = torch.load(init_file)
+
+    with torch.no_grad():
+        for name, value in policy.state_dict().items():
+            if name not in params:
+                continue
+            source = params[name]
+
+            if action_map is not None and name.startswith(INPUT_LAYERS):
+                continue
+            elif action_map is not None and (name.startswith('action_net') or name == 'log_std'):
+                for i, j in enumerate(action_map):
+                    if 0 <= j < source.shape[0]:
+                        value[i] = source[j]
+            elif source.shape == value.shape:
+                value.copy_(source)
+
+    if action_map is None:
+        obs_rms.mean[:] = init_obs_rms.mean
+        obs_rms.var[:] = init_obs_rms.var
+        obs_rms.count = init_obs_rms.count
+
+
+def run_ppo(env_id, robot, train_iters, eval_interval, save_file, config=None, deterministic=True, save_iter=False, history_file=None, init_file=None, action_map=None, best_reward=float('-inf'),
+            start_iter=0, schedule_iters=None):
 
     if config is None:
         config = default_config
 
-    train_envs = make_vec_envs(env_id, robot, config.seed, config.num_processes, gamma=config.gamma, vecnormalize=True)
+    # learning rate schedule over schedule_iters, continued from start_iter when training resumes in stages
+    if schedule_iters is None:
+        schedule_iters = start_iter + train_iters
+
+    train_envs = make_vec_envs(env_id, robot, config.seed, config.num_processes, gamma=config.gamma, vecnormalize=True, shared_memory=config.shared_memory)
 
-    eval_envs = make_vec_envs(env_id, robot, config.seed, config.eval_processes, gamma=None, vecnormalize=True)
-    eval_envs.training = False
+    # evaluated with NumpyPolicy, which normalizes observations itself
+    eval_envs = make_vec_envs(env_id, robot, config.seed, config.eval_processes)
 
     policy = Policy(
         train_envs.observation_space,
@@ -41,6 +89,9 @@ def run_ppo(env_id, robot, train_iters, eval_interval, save_file, config=None, d
         device='cpu'
     )
 
+    if init_file is not None:
+        load_warm_start(policy, train_envs.obs_rms, init_file, action_map=action_map)
+
     algo = PPO(
         policy,
         train_envs,
@@ -58,7 +109,8 @@ def run_ppo(env_id, robot, train_iters, eval_interval, save_file, config=None, d
         max_grad_norm=config.max_grad_norm,
         device='cpu',
         lr_decay=config.lr_decay,
-        max_iter=train_iters*10)
+        max_iter=schedule_iters*10)
+    algo.iter = start_iter
 
 
     if save_iter:
@@ -75,15 +127,36 @@ def run_ppo(env_id, robot, train_iters, eval_interval, save_file, config=None, d
             writer.writeheader()
             writer.writerow(items)
 
-    max_reward = float('-inf')
+    # controller is only saved when it improves on best_reward (the reward of init_file when continuing training)
+    max_reward = best_reward
+
+    # early stopping: evaluations without improvement of more than min_delta, and divergence of log_std
+    stop_reason = None
+    patience_reward = best_reward
+    no_improvement = 0
 
     for iter in range(train_iters):
         
         algo.step()
 
+        log_std = policy.log_std.mean().item()
+        if not np.isfinite(log_std) or log_std > config.max_log_std:
+            stop_reason = f'log_std diverged ({log_std:.3f})'
+
         if (iter+1) % eval_interval == 0:
-            eval_envs.obs_rms = train_envs.obs_rms.copy()
-            reward = evaluate(policy, eval_envs, num_eval=config.eval_processes, deterministic=deterministic)
+            eval_policy = NumpyPolicy.from_state_dict(policy.state_dict(), train_envs.obs_rms)
+            reward = evaluate(eval_policy, eval_envs, num_eval=config.eval_processes, deterministic=deterministic)
+
+            if not np.isfinite(reward):
+                stop_reason = 'reward is not finite'
+            elif reward > patience_reward + config.early_stop_min_delta:
+                patience_reward = reward
+                no_improvement = 0
+            else:
+                no_improvement += 1
+                if config.early_stop_patience > 0 and no_improvement >= config.early_stop_patience:
+                    stop_reason = f'reward plateaued for {no_improvement} evaluations'
+
             if reward > max_reward:
                 max_reward = reward
                 if not save_iter:
@@ -91,7 +164,6 @@ def run_ppo(env_id, robot, train_iters, eval_interval, save_file, config=None, d
 
             if save_iter:
                 now = time.time()
-                log_std = policy.log_std.mean()
                 print(f'iteration: {iter+1:=5}  elapsed times: {now-interval:.3f}  reward: {reward:6.3f}  log_std: {log_std:.5f}')
                 interval = now
 
@@ -105,7 +177,105 @@ def run_ppo(env_id, robot, train_iters, eval_interval, save_file, config=None, d
                     writer = csv.DictWriter(f, fieldnames=history_header)
                     writer.writerow(items)
 
+        if stop_reason is not None:
+            print(f'ppo stopped at iteration {iter+1}/{train_iters}: {stop_reason}')
+            break
+
     train_envs.close()
     eval_envs.close()
 
     return max_reward
+
+
+def run_multi_ppo(env_id, robots, train_iters, eval_interval, save_files, config=None, deterministic=True):
+    """
+    Train controllers of several robots at once with MultiPPO, each with its own envs and normalizer.
+    Controllers are evaluated and saved as in run_ppo, returns the best reward of each robot.
+    A robot which meets an early stopping condition is no longer stepped or updated,
+    training ends when every robot has stopped.
+    """
+
+    if config is None:
+        config = default_config
+
+    train_envs, eval_envs = [], []
+    for robot in robots:
+        train_envs.append(make_vec_envs(env_id, robot, config.seed, config.num_processes, gamma=config.gamma, vecnormalize=True, shared_memory=config.shared_memory))
+        eval_envs.append(make_vec_envs(env_id, robot, config.seed, config.eval_processes))
+
+    policy = MultiPolicy(
+        [envs.observation_space.shape[-1] for envs in train_envs],
+        [envs.action_space.shape[-1] for envs in train_envs],
+        init_log_std=config.init_log_std
+    )
+
+    algo = MultiPPO(
+        policy,
+        train_envs,
+        learning_rate=config.learning_rate,
+        n_steps=config.steps,
+        batch_size=config.steps*config.num_processes//config.num_mini_batch,
+        n_epochs=config.epochs,
+        gamma=config.gamma,
+        gae_lambda=config.gae_lambda,
+        clip_range=config.clip_range,
+        clip_range_vf=config.clip_range,
+        normalize_advantage=True,
+        ent_coef=config.ent_coef,
+        vf_coef=config.vf_coef,
+        max_grad_norm=config.max_grad_norm,
+        lr_decay=config.lr_decay,
+        max_iter=train_iters*10)
+
+    num_robots = len(robots)
+    max_rewards = [float('-inf')] * num_robots
+    patience_rewards = [float('-inf')] * num_robots
+    no_improvement = [0] * num_robots
+    # stopped robots are no longer trained, evaluated or saved
+    stopped = [False] * num_robots
+
+    for iter in range(train_iters):
+
+        algo.step()
+
+        log_stds = policy.log_std.detach()
+        for k in range(num_robots):
+            log_std = log_stds[k, :policy.act_dims[k]].mean().item()
+            if not stopped[k] and (not np.isfinite(log_std) or log_std > config.max_log_std):
+                stopped[k] = True
+
+        if (iter+1) % eval_interval == 0:
+            for k in range(num_robots):
+                if stopped[k]:
+                    continue
+
+                state_dict = policy.get_policy_state_dict(k)
+                eval_policy = NumpyPolicy.from_state_dict(state_dict, train_envs[k].obs_rms)
+                reward = evaluate(eval_policy, eval_envs[k], num_eval=config.eval_processes, deterministic=deterministic)
+
+                if not np.isfinite(reward):
+                    stopped[k] = True
+                elif reward > patience_rewards[k] + config.early_stop_min_delta:
+                    patience_rewards[k] = reward
+                    no_improvement[k] = 0
+                else:
+                    no_improvement[k] += 1
+                    if config.early_stop_patience > 0 and no_improvement[k] >= config.early_stop_patience:
+                        stopped[k] = True
+
+                if reward > max_rewards[k]:
+                    max_rewards[k] = reward
+                    torch.save([state_dict, train_envs[k].obs_rms], save_files[k] + '.pt')
+
+        for k in range(num_robots):
+            if stopped[k] and algo.active[k] > 0:
+                algo.stop(k)
+
+        if all(stopped):
+            print(f'ppo stopped at iteration {iter+1}/{train_iters}: every robot met a stopping condition')
+            break
+
+    for envs in train_envs + eval_envs:
+        envs.close()
+
+    return max_rewards
@@ -3,12 +3,11 @@ import csv
 import time
 import pickle
 import numpy as np
-import torch
 
 import multiprocessing
 from multiprocessing import Process
 
-from ppo import Policy
+from numpy_policy import NumpyPolicy
 
 from gym_utils import make_vec_envs
 
@@ -82,9 +81,7 @@ class EvogymControllerSimulatorPPO:
 
     def initialize(self):
         self.generation = -1
-        self.env = make_vec_envs(self.env_id, self.robot, 0, 1, vecnormalize=True)
-        self.env.training = False
-        self.controller = Policy(self.env.observation_space, self.env.action_space, device='cpu')
+        self.env = make_vec_envs(self.env_id, self.robot, 0, 1)
 
     def update(self):
 
@@ -103,9 +100,7 @@ class EvogymControllerSimulatorPPO:
             self.generation = self.iter
             controller_file = os.path.join(self.load_path, f'{self.iter}.pt')
 
-            params, obs_rms = torch.load(controller_file)
-            self.controller.load_state_dict(params)
-            self.env.obs_rms = obs_rms
+            self.controller = NumpyPolicy.load(controller_file)
             
             print(f'simulator update controller: iter {self.iter}')
 
@@ -117,8 +112,7 @@ class EvogymControllerSimulatorPPO:
         done = False
         obs = self.env.reset()
         while not done:
-            with torch.no_grad():
-                action = self.controller.predict(obs, deterministic=self.deterministic)
+            action = self.controller.predict(obs, deterministic=self.deterministic)
             obs, _, done, infos = self.env.step(action)
             self.env.render()
 
@@ -166,13 +160,8 @@ class EvogymStructureSimulator:
                 if self.env is not None:
                     self.env.close()
 
-                self.env = make_vec_envs(self.env_id, robot, 0, 1, vecnormalize=True)
-                self.env.training = False
-                self.controller = Policy(self.env.observation_space, self.env.action_space, device='cpu')
-
-                params, obs_rms = torch.load(controller_file)
-                self.controller.load_state_dict(params)
-                self.env.obs_rms = obs_rms
+                self.env = make_vec_envs(self.env_id, robot, 0, 1)
+                self.controller = NumpyPolicy.load(controller_file)
 
                 self.generation = int(latest[0])
                 print(f'simulator update controller: generation {latest[0]}  id {latest[1]}')
@@ -186,8 +175,7 @@ class EvogymStructureSimulator:
         done = False
         obs = self.env.reset()
         while not done:
-            with torch.no_grad():
-                action = self.controller.predict(obs, deterministic=self.deterministic)
+            action = self.controller.predict(obs, deterministic=self.deterministic)
             obs, _, done, infos = self.env.step(action)
             self.env.render()
 
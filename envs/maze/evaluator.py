@@ -1,67 +1,76 @@
+import math
 import numpy as np
 
+from maze_kernel import run_episode
+
+
+def compact_path(samples, last_loc):
+    # downsampled trajectory ending at the final location, small enough to ship back with results
+    if len(samples)==0 or not np.array_equal(samples[-1], last_loc):
+        samples = np.vstack([samples, last_loc])
+    return samples.astype(np.float32)
+
+
 class MazeControllerEvaluator:
-    def __init__(self, maze, timesteps):
+    def __init__(self, maze, timesteps, use_kernel=False, path_interval=0):
         self.maze = maze
         self.timesteps = timesteps
+        self.use_kernel = use_kernel
+        self.path_interval = path_interval
 
     def evaluate_agent(self, key, controller, generation):
-        self.maze.reset()
-
-        done = False
-        for i in range(self.timesteps):
-            obs = self.maze.get_observation()
-            action = controller.activate(obs)
-            done = self.maze.update(action)
-            if done:
-                break
+        done, last_loc, samples, _ = run_episode(self.maze, controller, self.timesteps, sample_interval=self.path_interval, use_kernel=self.use_kernel)
 
         if done:
             score = 1.0
         else:
-            distance = self.maze.get_distance_to_exit()
-            score = (self.maze.initial_distance - distance) / self.maze.initial_distance
+            distance = np.linalg.norm(last_loc-self.maze.exit_point)
+            initial_distance = np.linalg.norm(self.maze.init_location-self.maze.exit_point)
+            score = (initial_distance - distance) / initial_distance
 
-        last_loc = self.maze.get_agent_location()
         results = {
             'fitness': score,
             'data': last_loc
         }
+        if self.path_interval>0:
+            results['path'] = compact_path(samples, last_loc)
         return results
 
 
 class MazeControllerEvaluatorNS:
-    def __init__(self, maze, timesteps):
+    def __init__(self, maze, timesteps, use_kernel=False, path_interval=0, point_interval=40):
         self.maze = maze
         self.timesteps = timesteps
+        self.use_kernel = use_kernel
+        self.path_interval = path_interval
+        self.point_interval = point_interval
 
     def evaluate_agent(self, key, controller, generation):
-        self.maze.reset()
+        # sample at an interval both the novelty points and the recorded path can be picked from
+        if self.path_interval>0:
+            sample_interval = math.gcd(self.point_interval, self.path_interval)
+        else:
+            sample_interval = self.point_interval
+        done, last_loc, samples, _ = run_episode(self.maze, controller, self.timesteps, sample_interval=sample_interval, use_kernel=self.use_kernel)
 
-        done = False
         prev_loc=np.array([0,0])
         move_vectors=[]
-        for i in range(self.timesteps):
-            obs = self.maze.get_observation()
-            action = controller.activate(obs)
-            done = self.maze.update(action)
-            if i%40==0:
-                cur_loc = self.maze.get_agent_location()
-                move_vectors.append(np.array([cur_loc[0]-prev_loc[0],cur_loc[1]-prev_loc[1]]))
-                prev_loc=cur_loc
-            if done:
-                break
+        for cur_loc in samples[::self.point_interval//sample_interval]:
+            move_vectors.append(np.array([cur_loc[0]-prev_loc[0],cur_loc[1]-prev_loc[1]]))
+            prev_loc=cur_loc
 
         if done:
             score = 1.0
         else:
-            distance = self.maze.get_distance_to_exit()
-            score = (self.maze.initial_distance - distance) / self.maze.initial_distance
+            distance = np.linalg.norm(last_loc-self.maze.exit_point)
+            initial_distance = np.linalg.norm(self.maze.init_location-self.maze.exit_point)
+            score = (initial_distance - distance) / initial_distance
 
-        last_loc = self.maze.get_agent_location()
         results = {
             'score': score,
             'data': last_loc,
             'points': move_vectors
         }
+        if self.path_interval>0:
+            results['path'] = compact_path(samples[::self.path_interval//sample_interval], last_loc)
         return results
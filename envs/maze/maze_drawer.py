@@ -9,12 +9,10 @@ from ns_neat import BaseReporter as BaseReporterNS
 
 
 class MazeReporterNEAT(BaseReporterNEAT):
-    def __init__(self, env, timesteps, save_path, decode_function, generations, no_plot=False):
+    def __init__(self, env, save_path, generations, no_plot=False):
 
         self.env = env
-        self.timesteps = timesteps
         self.save_path = save_path
-        self.decode_function = decode_function
         self.generations = generations
         self.no_plot = no_plot
 
@@ -58,20 +56,8 @@ class MazeReporterNEAT(BaseReporterNEAT):
             self.best_path = self._get_path(genome_best, config)
 
     def _get_path(self, genome, config):
-        controller = self.decode_function(genome, config.genome_config)
-        self.env.reset()
-
-        path = []
-        for i in range(self.timesteps):
-            obs = self.env.get_observation()
-            action = controller.activate(obs)
-            done = self.env.update(action)
-
-            path.append(self.env.get_agent_location())
-
-            if done:
-                break
-        return np.vstack(path)
+        # path is recorded by the evaluator (path_interval > 0), never re-simulated here
+        return np.vstack([self.start_point, genome.path])
 
     def post_evaluate(self, config, population, species, best_genome):
         self._update_path(population, config)
@@ -109,12 +95,10 @@ class MazeReporterNEAT(BaseReporterNEAT):
 
 
 class MazeReporterNS(BaseReporterNS):
-    def __init__(self, env, timesteps, save_path, decode_function, generations, no_plot=False):
+    def __init__(self, env, save_path, generations, no_plot=False):
 
         self.env = env
-        self.timesteps = timesteps
         self.save_path = save_path
-        self.decode_function = decode_function
         self.generations = generations
         self.no_plot = no_plot
 
@@ -162,20 +146,8 @@ class MazeReporterNS(BaseReporterNS):
         self.novelty_path = self._get_path(genome_novelty, config)
 
     def _get_path(self, genome, config):
-        controller = self.decode_function(genome, config.genome_config)
-        self.env.reset()
-
-        path = []
-        for i in range(self.timesteps):
-            obs = self.env.get_observation()
-            action = controller.activate(obs)
-            done = self.env.update(action)
-
-            path.append(self.env.get_agent_location())
-
-            if done:
-                break
-        return np.vstack(path)
+        # path is recorded by the evaluator (path_interval > 0), never re-simulated here
+        return np.vstack([self.start_point, genome.path])
 
     def post_evaluate(self, config, population, species, best_genome):
         self._update_path(population, config)
@@ -44,12 +44,15 @@ class Agent:
     def distance_to_exit(self, exit_point):
         return np.linalg.norm(self.location-exit_point)
 
-    def update_rangefinder_sensors(self, walls):
+    def update_rangefinder_sensors(self, walls, wall_vectors=None):
 
         range_finder_angles = (self.range_finder_angles + self.heading) / 180 * np.pi
 
         A = np.expand_dims(walls[:,0,:], axis=0)
-        B = np.expand_dims(walls[:,1,:], axis=0)
+        if wall_vectors is None:
+            BA = np.expand_dims(walls[:,1,:]-walls[:,0,:], axis=0)
+        else:
+            BA = np.expand_dims(wall_vectors, axis=0)
 
         location = np.expand_dims(self.location, axis=0)
         finder_points = location + self.range_finder_range * np.vstack([np.cos(range_finder_angles), np.sin(range_finder_angles)]).T
@@ -59,7 +62,6 @@ class Agent:
 
         AC = A-C
         DC = D-C
-        BA = B-A
 
         rTop = AC[:,:,1] * DC[:,:,0] - AC[:,:,0] * DC[:,:,1]
         sTop = AC[:,:,1] * BA[:,:,0] - AC[:,:,0] * BA[:,:,1]
@@ -73,6 +75,11 @@ class Agent:
             np.linalg.norm(A + np.expand_dims(r, axis=-1) * BA - C, axis=-1), self.range_finder_range)
         self.range_finders = np.min(distances, axis=1) / self.range_finder_range
 
+    def update_rangefinder_sensors_raster(self, raster):
+        range_finder_angles = (self.range_finder_angles + self.heading) / 180 * np.pi
+        distances = raster.cast_rays(self.location, range_finder_angles)
+        self.range_finders = distances / self.range_finder_range
+
     def update_radars(self, exit_point):
         exit_angle = np.arctan2(exit_point[0]-self.location[0], exit_point[1]-self.location[1]) % np.pi
         radar_angles = (self.radar_angles + self.heading) /180 *np.pi
@@ -84,9 +91,63 @@ class Agent:
         self.radar = radar
 
 
+class WallRaster:
+    """
+    Occupancy grid of the walls for approximate range finders.
+    Rays are marched at half a cell per sample against the grid, so the cost does not depend
+    on the number of walls, and distances are within about one cell (resolution) of the exact ones.
+    Suited to the axis-aligned grid mazes; diagonal walls are rasterized more coarsely.
+    """
+    def __init__(self, walls, resolution, ray_range):
+        self.resolution = resolution
+        self.ray_range = ray_range
+
+        points = walls.reshape(-1,2)
+        self.origin = np.min(points, axis=0) - resolution
+        self.shape = np.ceil((np.max(points, axis=0) + resolution - self.origin) / resolution).astype(int) + 1
+
+        # mark the cells a wall passes through, sampled at a quarter cell along the wall.
+        # diagonal steps also mark both side cells, so that rays can not slip through the corners.
+        self.grid = np.zeros(self.shape, dtype=bool)
+        for start, end in walls:
+            num = int(np.ceil(np.linalg.norm(end-start) / (resolution*0.25))) + 1
+            wall_points = start + np.linspace(0, 1, num)[:,None] * (end-start)
+            cells = np.floor((wall_points - self.origin) / resolution).astype(int)
+            self.grid[cells[:,0], cells[:,1]] = True
+            self.grid[cells[1:,0], cells[:-1,1]] = True
+            self.grid[cells[:-1,0], cells[1:,1]] = True
+
+        self.step = resolution * 0.5
+        self.ray_steps = np.arange(1, int(np.ceil(ray_range / self.step)) + 1) * self.step
+
+    def cast_rays(self, location, angles):
+        directions = np.vstack([np.cos(angles), np.sin(angles)]).T
+        points = location + directions[:,None,:] * self.ray_steps[None,:,None]
+        cells = np.floor((points - self.origin) / self.resolution).astype(int)
+
+        inside = np.all((cells>=0) & (cells<self.shape), axis=-1)
+        cells = np.clip(cells, 0, self.shape-1)
+        hit = inside & self.grid[cells[...,0], cells[...,1]]
+
+        # the wall lies between the first occupied sample and the one before it
+        first = np.argmax(hit, axis=1)
+        distances = np.where(np.any(hit, axis=1), self.ray_steps[first] - self.step*0.5, self.ray_range)
+        return np.minimum(distances, self.ray_range)
+
+
 class MazeEnvironment:
-    def __init__(self, init_location, walls, exit_point, init_heading=180, exit_range=5.0, agent_kwargs={}):
-        self.walls = walls
+    def __init__(self, init_location, walls, exit_point, init_heading=180, exit_range=5.0, sensor_resolution=0, agent_kwargs={}):
+        # walls never move, so merge them and prepare the values used by every step
+        self.walls = preprocess_walls(walls)
+        self.wall_vectors = self.walls[:,1,:] - self.walls[:,0,:]
+        self.wall_sq_lengths = np.sum(np.square(self.wall_vectors), axis=1)
+        # range finders use the wall raster when resolution > 0, the exact intersection otherwise.
+        # the raster is built here, so it is pickled with the environment instead of rebuilt by every worker
+        self.sensor_resolution = sensor_resolution
+        self.raster = None
+        if sensor_resolution > 0:
+            ray_range = Agent(location=init_location, heading=init_heading, **agent_kwargs).range_finder_range
+            self.raster = WallRaster(self.walls, sensor_resolution, ray_range)
         self.exit_point = exit_point
         self.exit_range = exit_range
         self.init_location = init_location
@@ -103,7 +164,13 @@ class MazeEnvironment:
         self.initial_distance = self.agent.distance_to_exit(self.exit_point)
 
         # Update sensors
-        self.agent.update_rangefinder_sensors(self.walls)
+        self.update_sensors()
+
+    def update_sensors(self):
+        if self.raster is not None:
+            self.agent.update_rangefinder_sensors_raster(self.raster)
+        else:
+            self.agent.update_rangefinder_sensors(self.walls, self.wall_vectors)
         self.agent.update_radars(self.exit_point)
 
     def get_distance_to_exit(self):
@@ -120,10 +187,10 @@ class MazeEnvironment:
         A = self.walls[:,0,:]
         B = self.walls[:,1,:]
         C = np.expand_dims(location, axis=0)
-        BA = B-A
+        BA = self.wall_vectors
 
         uTop = np.sum( (C - A) * BA, axis=1)
-        uBot = np.sum(np.square(BA), axis=1)
+        uBot = self.wall_sq_lengths
 
         u = uTop / uBot
 
@@ -160,8 +227,7 @@ class MazeEnvironment:
             self.agent.location = new_loc
 
         # update agent's sensors
-        self.agent.update_rangefinder_sensors(self.walls)
-        self.agent.update_radars(self.exit_point)
+        self.update_sensors()
 
         # check if agent reached exit point
         distance = self.get_distance_to_exit()
@@ -224,3 +290,91 @@ class MazeEnvironment:
             **maze_kwargs,
             agent_kwargs=agent_kwargs
         )
+
+
+def preprocess_walls(walls, eps=1e-9):
+    """
+    Remove zero-length and duplicated walls, and merge colinear walls which overlap or touch.
+    Arguments:
+        walls: array of walls with shape (n, 2, 2).
+    Returns:
+        array of walls with shape (m, 2, 2), m <= n.
+    """
+    walls = np.asarray(walls, dtype=float).reshape(-1,2,2)
+    vectors = walls[:,1,:] - walls[:,0,:]
+    lengths = np.linalg.norm(vectors, axis=1)
+    walls, vectors, lengths = walls[lengths>eps], vectors[lengths>eps], lengths[lengths>eps]
+
+    # same line if same direction (up to sign) and same offset from origin
+    directions = vectors / np.expand_dims(lengths, axis=1)
+    flip = (directions[:,0]<-eps) | ((np.abs(directions[:,0])<=eps) & (directions[:,1]<0))
+    directions[flip] *= -1
+    offsets = directions[:,0]*walls[:,0,1] - directions[:,1]*walls[:,0,0]
+    line_keys = np.round(np.hstack([directions, np.expand_dims(offsets, axis=1)]) / 1e-6).astype(np.int64)
+
+    merged = []
+    lines = {}
+    for i,key in enumerate(map(tuple, line_keys)):
+        lines.setdefault(key, []).append(i)
+
+    for indices in lines.values():
+        direction = directions[indices[0]]
+        # interval of each wall on the line, keeping the original end points
+        intervals = []
+        for i in indices:
+            p, q = walls[i]
+            tp, tq = np.dot(p, direction), np.dot(q, direction)
+            intervals.append((tp, p, tq, q) if tp<=tq else (tq, q, tp, p))
+        intervals.sort(key=lambda z: z[0])
+
+        start_t, start_p, end_t, end_p = intervals[0]
+        for t0, p0, t1, p1 in intervals[1:]:
+            if t0 <= end_t + eps:
+                if t1 > end_t:
+                    end_t, end_p = t1, p1
+            else:
+                merged.append((start_p, end_p))
+                start_t, start_p, end_t, end_p = t0, p0, t1, p1
+        merged.append((start_p, end_p))
+
+    return np.array(merged, dtype=float).reshape(-1,2,2)
+
+
+def compare_sensor_modes(env, resolution, num_samples=1000, seed=None):
+    """
+    Accuracy of the raster range finders against the exact ones, measured at random
+    collision free locations and headings inside the maze.
+    Returns:
+        dict of mean, max, 99th percentile and root mean square error of the range finder readings (range normalized to 1).
+    """
+    rng = np.random.default_rng(seed)
+    env_agent = env.agent
+    agent = Agent(location=env.init_location, heading=env.init_heading, **env.agent_kwargs)
+    raster = WallRaster(env.walls, resolution, agent.range_finder_range)
+
+    lower = np.min(env.walls.reshape(-1,2), axis=0)
+    upper = np.max(env.walls.reshape(-1,2), axis=0)
+
+    errors = []
+    while len(errors) < num_samples:
+        location = rng.uniform(lower, upper)
+        env.agent = agent
+        if env.test_wall_collision(location):
+            continue
+
+        agent.location = location
+        agent.heading = rng.uniform(0, 360)
+        agent.update_rangefinder_sensors(env.walls, env.wall_vectors)
+        exact = agent.range_finders
+        agent.update_rangefinder_sensors_raster(raster)
+        errors.append(np.abs(agent.range_finders - exact))
+    env.agent = env_agent
+
+    errors = np.vstack(errors)
+    return {
+        'resolution': resolution,
+        'mean_error': float(np.mean(errors)),
+        'max_error': float(np.max(errors)),
+        'p99_error': float(np.percentile(errors, 99)),
+        'rmse': float(np.sqrt(np.mean(np.square(errors)))),
+    }
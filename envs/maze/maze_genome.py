@@ -1,4 +1,5 @@
 import math
+import hashlib
 import itertools
 import random
 
@@ -250,68 +251,69 @@ class MazeGenome:
         del self.wall_genes[delete_idx]
         return True
 
-    def mutate_path_attr(self, config):
-        valid = False
-        invalid_count = 0
-        while not valid and invalid_count<50:
-            path_attrs = [(path_gene.pathpoint, path_gene.horizontal) for path_gene in self.path_genes]
+    def get_path_attrs(self):
+        return [(path_gene.pathpoint, path_gene.horizontal) for path_gene in self.path_genes]
 
-            mutate_idx = random.randrange(0,len(self.path_genes))
+    def mutate_path_attr(self, config):
+        def candidates():
+            for _ in range(50):
+                mutate_idx = random.randrange(0,len(self.path_genes))
 
-            clone = self.path_genes[mutate_idx].copy()
-            # clone.mutate(config)
-            clone.init_attributes(self.maze_size[0], self.maze_size[1])
+                clone = self.path_genes[mutate_idx].copy()
+                # clone.mutate(config)
+                clone.init_attributes(self.maze_size[0], self.maze_size[1])
 
-            path_attrs[mutate_idx] = (clone.pathpoint, clone.horizontal)
-            valid = self.check_path_validity(path_attrs, self.maze_size)
+                edit = (mutate_idx, mutate_idx+1, [(clone.pathpoint, clone.horizontal)])
+                yield edit, (mutate_idx, clone)
 
-            invalid_count += 1
+        result = self.find_valid_path_edit(self.get_path_attrs(), self.maze_size, candidates())
+        if result is None:
+            return False
 
-        if valid:
-            self.path_genes[mutate_idx] = clone
-        return valid
+        mutate_idx, clone = result
+        self.path_genes[mutate_idx] = clone
+        return True
 
     def mutate_add_path(self, config):
         key = config.get_new_path_key()
-        valid = False
-        invalid_count = 0
         idx_candidates = list(range(1,len(self.path_genes)+1))
-        while not valid and invalid_count<10:
-            path_attrs = [(path_gene.pathpoint, path_gene.horizontal) for path_gene in self.path_genes]
 
-            # insert_idx = random.randint(1,len(self.path_genes))
-            insert_idx = random.choices(idx_candidates, k=1, weights=idx_candidates)[0]
+        def candidates():
+            for _ in range(10):
+                # insert_idx = random.randint(1,len(self.path_genes))
+                insert_idx = random.choices(idx_candidates, k=1, weights=idx_candidates)[0]
 
-            new_gene = self.create_path(key)
-            path_attrs.insert(insert_idx, (new_gene.pathpoint, new_gene.horizontal))
+                new_gene = self.create_path(key)
 
-            valid = self.check_path_validity(path_attrs, self.maze_size)
+                edit = (insert_idx, insert_idx, [(new_gene.pathpoint, new_gene.horizontal)])
+                yield edit, (insert_idx, new_gene)
 
-            invalid_count += 1
+        result = self.find_valid_path_edit(self.get_path_attrs(), self.maze_size, candidates())
+        if result is None:
+            return False
 
-        if valid:
-            self.path_genes.insert(insert_idx, new_gene)
-        return valid
+        insert_idx, new_gene = result
+        self.path_genes.insert(insert_idx, new_gene)
+        return True
 
     def mutate_delete_path(self, config):
         if len(self.path_genes)<2:
             return False
 
-        valid = False
-        invalid_count = 0
-        while not valid and invalid_count<50:
-            path_attrs = [(path_gene.pathpoint, path_gene.horizontal) for path_gene in self.path_genes]
+        def candidates():
+            for _ in range(50):
+                delete_idx = random.randrange(1,len(self.path_genes))
 
-            delete_idx = random.randrange(1,len(self.path_genes))
-            path_attrs.pop(delete_idx)
+                edit = (delete_idx, delete_idx+1, [])
+                yield edit, delete_idx
 
-            valid = self.check_path_validity(path_attrs, self.maze_size)
-
-            invalid_count += 1
+        result = self.find_valid_path_edit(self.get_path_attrs(), self.maze_size, candidates())
+        if result is None:
+            return False
 
-        if valid:
-            del self.path_genes[delete_idx]
-        return valid
+        delete_idx = result
+        del self.path_genes[delete_idx]
+        return True
 
     def mutate_expand_width(self, config):
         self.maze_size[0] += 1
@@ -321,6 +323,14 @@ class MazeGenome:
         self.maze_size[1] += 1
         return True
 
+    def get_content_key(self):
+        # identical for genomes which decode into the same maze.
+        # a 128 bit digest of the exact attribute values, so different mazes never share cached phenomes or outcomes
+        walls = tuple((float(wall_gene.wall_location), float(wall_gene.passage_location), wall_gene.horizontal) for wall_gene in self.wall_genes)
+        paths = tuple((tuple(path_gene.pathpoint), path_gene.horizontal) for path_gene in self.path_genes)
+        content = repr((tuple(self.maze_size), walls, paths)).encode()
+        return hashlib.blake2b(content, digest_size=16).hexdigest()
+
     def get_maze_area(self):
         return self.maze_size[0]*self.maze_size[1]
 
@@ -336,31 +346,111 @@ class MazeGenome:
 
     @staticmethod
     def check_path_validity(pathways, maze_size):
+        occupied = bytearray(get_path_grid_size(maze_size))
+        end_p = (maze_size[0]-1, maze_size[1]-1)
+
+        for cur_p, cur_horizontal in pathways[::-1]:
+            if not is_valid_pathway(cur_p, end_p, maze_size):
+                return False
+
+            runs = get_pathway_runs(cur_p, cur_horizontal, end_p, maze_size)
+            for run in runs:
+                if 1 in occupied[run.start:run.stop:run.step]:
+                    return False
+            for run in runs:
+                occupied[run.start:run.stop:run.step] = b'\x01' * len(run)
+            end_p = cur_p
+        return True
+
+    @staticmethod
+    def find_valid_path_edit(pathways, maze_size, candidates):
+        """
+        Validate candidate edits of pathways in order, and return the payload of the first valid one (None if no one).
+        Each candidate is ((start, stop, replacement), payload), meaning pathways[:start] + replacement + pathways[stop:].
+        """
+        occupancy = PathOccupancy(pathways, maze_size)
+        for (start, stop, replacement), payload in candidates:
+            if occupancy.check_edit(start, stop, replacement):
+                return payload
+        return None
+
+
+# cell index of point (x,y) is x+y*maze_size[1]
+def get_path_grid_size(maze_size):
+    return maze_size[0] + maze_size[1]*maze_size[1]
+
+def is_valid_pathway(cur_p, end_p, maze_size):
+    return not (cur_p[0]<0 or cur_p[1]<0 or cur_p[0]>=maze_size[0] or cur_p[1]>=maze_size[1]\
+                or end_p==(0,0) or cur_p==(maze_size[0]-1, maze_size[1]-1)\
+                or cur_p[0]==end_p[0] or cur_p[1]==end_p[1])
+
+def get_pathway_runs(cur_p, cur_horizontal, end_p, maze_size):
+    # cell indices passed from cur_p to end_p (end_p excluded), as two straight runs
+    stride = maze_size[1]
+    step_x = 1 if cur_p[0]<end_p[0] else -1
+    step_y = stride if cur_p[1]<end_p[1] else -stride
+    if cur_horizontal:
+        corner = end_p[0]+cur_p[1]*stride
+        return (range(cur_p[0]+cur_p[1]*stride, corner, step_x),
+                range(corner, end_p[0]+end_p[1]*stride, step_y))
+    else:
+        corner = cur_p[0]+end_p[1]*stride
+        return (range(cur_p[0]+cur_p[1]*stride, corner, step_y),
+                range(corner, end_p[0]+end_p[1]*stride, step_x))
+
+
+class PathOccupancy:
+    """
+    Cells occupied by pathways, to validate many edits of the same pathways.
+    Pathways are checked from the last one as in check_path_validity,
+    so the unchanged tail pathways[stop:] of an edit is processed only once here.
+    """
+    def __init__(self, pathways, maze_size):
+        self.pathways = pathways
+        self.maze_size = maze_size
+        self.grid_size = get_path_grid_size(maze_size)
+
+        # index of pathway occupying the cell (-1: free). pathways[stop:] occupy cells with owner >= stop
+        self.owner = [-1] * self.grid_size
+        # whether pathways[stop:] is valid by itself
+        self.tail_valid = [False] * (len(pathways)+1)
+        self.tail_valid[-1] = True
 
-        point_history = []
         end_p = (maze_size[0]-1, maze_size[1]-1)
-        end_horizontal = None
+        for i in range(len(pathways)-1, -1, -1):
+            cur_p, cur_horizontal = pathways[i]
+            if not is_valid_pathway(cur_p, end_p, maze_size):
+                break
+
+            runs = get_pathway_runs(cur_p, cur_horizontal, end_p, maze_size)
+            if any(max(self.owner[run.start:run.stop:run.step])>=0 for run in runs):
+                break
+            for run in runs:
+                self.owner[run.start:run.stop:run.step] = [i] * len(run)
+
+            self.tail_valid[i] = True
+            end_p = cur_p
 
-        for pathway in pathways[::-1]:
-            cur_p = pathway[0]
-            cur_horizontal = pathway[1]
+    def check_edit(self, start, stop, replacement):
+        if not self.tail_valid[stop]:
+            return False
+
+        occupied = bytearray(self.grid_size)
+        if stop < len(self.pathways):
+            end_p = self.pathways[stop][0]
+        else:
+            end_p = (self.maze_size[0]-1, self.maze_size[1]-1)
 
-            if cur_p[0]<0 or cur_p[1]<0 or cur_p[0]>=maze_size[0] or cur_p[1]>=maze_size[1]\
-               or end_p==(0,0) or cur_p==(maze_size[0]-1, maze_size[1]-1)\
-               or cur_p[0]==end_p[0] or cur_p[1]==end_p[1]:
+        for cur_p, cur_horizontal in (self.pathways[:start] + replacement)[::-1]:
+            if not is_valid_pathway(cur_p, end_p, self.maze_size):
                 return False
 
-            points = []
-            if cur_horizontal:
-                points.extend([x+cur_p[1]*maze_size[1] for x in range(cur_p[0], end_p[0], 1 if cur_p[0]<end_p[0] else -1)])
-                points.extend([end_p[0]+y*maze_size[1] for y in range(cur_p[1], end_p[1], 1 if cur_p[1]<end_p[1] else -1)])
-            else:
-                points.extend([cur_p[0]+y*maze_size[1] for y in range(cur_p[1], end_p[1], 1 if cur_p[1]<end_p[1] else -1)])
-                points.extend([x+end_p[1]*maze_size[1] for x in range(cur_p[0], end_p[0], 1 if cur_p[0]<end_p[0] else -1)])
-            for p in points:
-                if p in point_history:
+            runs = get_pathway_runs(cur_p, cur_horizontal, end_p, self.maze_size)
+            for run in runs:
+                if 1 in occupied[run.start:run.stop:run.step] or\
+                   max(self.owner[run.start:run.stop:run.step])>=stop:
                     return False
-            point_history.extend(points)
+            for run in runs:
+                occupied[run.start:run.stop:run.step] = b'\x01' * len(run)
             end_p = cur_p
-            end_horizontal = cur_horizontal
         return True
@@ -1,4 +1,5 @@
 import os
+from collections import OrderedDict, deque
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -6,7 +7,7 @@ from maze_environment_numpy  import MazeEnvironment
 
 class MazeGenomeDecoder:
 
-    def __init__(self, config, maze_kwargs={}, agent_kwargs={}):
+    def __init__(self, config, maze_kwargs={}, agent_kwargs={}, cache_size=0):
         self.region_max_size = (config.region_max_width, config.region_max_height)
         self.region_min_size = (config.region_min_width, config.region_min_height)
         self.maze_scaler = config.maze_scaler
@@ -14,26 +15,32 @@ class MazeGenomeDecoder:
         self.maze_kwargs = maze_kwargs
         self.agent_kwargs = agent_kwargs
 
+        # decoded (env, timesteps, subregion_num) by genome.get_content_key(), 0 means no cache.
+        # the cached env is shared by every genome with the same content, it is reset before each simulation.
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
     # main decode function (maze genome -> wall list [(x1, y1, x2, y2)])
     def decode(self, genome, config, save=None, return_env=True):
-        maze_size = genome.maze_size
-        wall_genes = genome.wall_genes
-        path_genes = genome.path_genes
-
-        pathway_map = np.zeros((maze_size[1], maze_size[0]), dtype=int)
-        horizontal_wall_map = np.zeros((maze_size[1]+1, maze_size[0]), dtype=bool)
-        vertical_wall_map = np.zeros((maze_size[1], maze_size[0]+1), dtype=bool)
-
-        path_length = self.track_pathway(maze_size, path_genes, pathway_map, horizontal_wall_map, vertical_wall_map)
-
-        regions = self.divide_maze(maze_size, pathway_map)
-
-        self.surround_regions(regions, horizontal_wall_map, vertical_wall_map)
+        if self.cache_size>0 and save is None and return_env:
+            content_key = genome.get_content_key()
+            if content_key in self.cache:
+                self.cache.move_to_end(content_key)
+                env, timesteps, subregion_num = self.cache[content_key]
+                genome.subregion_num = subregion_num
+                return env, timesteps
+
+            env, timesteps = self.decode_maze(genome, save=save, return_env=return_env)
+            self.cache[content_key] = (env, timesteps, genome.subregion_num)
+            if len(self.cache)>self.cache_size:
+                self.cache.popitem(last=False)
+            return env, timesteps
 
-        subregion_num = self.map_walls_of_regions(wall_genes, regions, maze_size, pathway_map, horizontal_wall_map, vertical_wall_map)
-        genome.subregion_num = subregion_num
+        return self.decode_maze(genome, save=save, return_env=return_env)
 
-        self.surround_maze(horizontal_wall_map, vertical_wall_map)
+    def decode_maze(self, genome, save=None, return_env=True):
+        maze_size = genome.maze_size
+        pathway_map, horizontal_wall_map, vertical_wall_map, path_length = self.make_maps(genome)
 
         if save is not None:
             self.plot(save, maze_size, pathway_map, horizontal_wall_map, vertical_wall_map)
@@ -56,6 +63,29 @@ class MazeGenomeDecoder:
         else:
             return
 
+    # pathway and wall maps of genome, sets genome.subregion_num
+    def make_maps(self, genome):
+        maze_size = genome.maze_size
+        wall_genes = genome.wall_genes
+        path_genes = genome.path_genes
+
+        pathway_map = np.zeros((maze_size[1], maze_size[0]), dtype=int)
+        horizontal_wall_map = np.zeros((maze_size[1]+1, maze_size[0]), dtype=bool)
+        vertical_wall_map = np.zeros((maze_size[1], maze_size[0]+1), dtype=bool)
+
+        path_length = self.track_pathway(maze_size, path_genes, pathway_map, horizontal_wall_map, vertical_wall_map)
+
+        regions = self.divide_maze(maze_size, pathway_map)
+
+        self.surround_regions(regions, horizontal_wall_map, vertical_wall_map)
+
+        subregion_num = self.map_walls_of_regions(wall_genes, regions, maze_size, pathway_map, horizontal_wall_map, vertical_wall_map)
+        genome.subregion_num = subregion_num
+
+        self.surround_maze(horizontal_wall_map, vertical_wall_map)
+
+        return pathway_map, horizontal_wall_map, vertical_wall_map, path_length
+
     # track path reversely
     def track_pathway(self, maze_size, path_genes, path_map, h_wall_map, v_wall_map):
         path_length = 0
@@ -135,34 +165,42 @@ class MazeGenomeDecoder:
         region_id = 1
         region_map = np.zeros((maze_size[1], maze_size[0]), dtype=int)
         region_map[path_map>0] = -1
+
+        # run-lengths of free cells toward east and south.
+        # cells are taken in row-major order, so a new region only shortens east runs of its left side
+        occupied = region_map!=0
+        run_east = next_true_index(occupied) - np.arange(maze_size[0])
+        run_south = (next_true_index(occupied.T) - np.arange(maze_size[1])).T
+
         regions = {}
         for y,x in zip(*np.where(region_map==0)):
             if region_map[y,x]!=0:
                 continue
 
-            cut_out = region_map[y:y+self.region_max_size[1], x:x+self.region_max_size[0]]
+            cut_width = min(self.region_max_size[0], maze_size[0]-x)
+            cut_height = min(self.region_max_size[1], maze_size[1]-y)
 
-            if np.all(cut_out==0):
-                r_height, r_width = cut_out.shape
+            # width-first square
+            x_width = min(run_east[y,x], cut_width)
+            x_height = first_true(run_east[y:y+cut_height, x]<x_width)
+            # height-first square
+            y_height = min(run_south[y,x], cut_height)
+            y_width = first_true(run_south[y, x:x+cut_width]<y_height)
 
+            # chose the one with the lerger square area
+            if x_width*x_height > y_width*y_height:
+                r_width = x_width
+                r_height = x_height
             else:
-                # width-first square
-                x_width = cut_out.shape[1] if np.all(cut_out[0,:]==0) else np.where(cut_out[0,:]!=0)[0][0]
-                x_height = cut_out.shape[0] if np.all(cut_out[:,:x_width]==0) else np.where(np.any(cut_out[:,:x_width]!=0,axis=1))[0][0]
-                # height-first square
-                y_height = cut_out.shape[0] if np.all(cut_out[:,0]==0) else np.where(cut_out[:,0]!=0)[0][0]
-                y_width = cut_out.shape[1] if np.all(cut_out[:y_height,:]==0) else np.where(np.any(cut_out[:y_height,:]!=0,axis=0))[0][0]
-
-                # chose the one with the lerger square area
-                if x_width*x_height > y_width*y_height:
-                    r_width = x_width
-                    r_height = x_height
-                else:
-                    r_width = y_width
-                    r_height = y_height
+                r_width = y_width
+                r_height = y_height
 
             # map the region id
             region_map[y:y+r_height, x:x+r_width] = region_id
+            run_east[y:y+r_height, x:x+r_width] = 0
+            run_south[y:y+r_height, x:x+r_width] = 0
+            run_east[y:y+r_height, :x] = np.minimum(run_east[y:y+r_height, :x], x-np.arange(x))
+
             regions[region_id] = {
                 'id': region_id,
                 'point': (x,y),
@@ -188,13 +226,15 @@ class MazeGenomeDecoder:
 
     def map_walls_of_regions(self, wall_genes, regions, maze_size, path_map, h_wall_map, v_wall_map):
 
-        subregion_queue = list(regions.values())
+        path_distances = self.get_entrance_lookup(maze_size, path_map)
+
+        subregion_queue = deque(regions.values())
         # region_idx = {region_id: 0 for region_id in regions.keys()}
         region_idx = 0
         region_id = max(regions.keys())
 
         while subregion_queue:
-            subregion = subregion_queue.pop(0)
+            subregion = subregion_queue.popleft()
 
             r_id = subregion['id']
             r_width, r_height = subregion['size']
@@ -207,7 +247,7 @@ class MazeGenomeDecoder:
                 if r_depth==1:
                     v_point = r_start
                     h_point = r_start
-                    self.make_entrance(h_point, v_point, r_start, r_end, maze_size, path_map, h_wall_map, v_wall_map)
+                    self.make_entrance(h_point, v_point, r_start, r_end, path_distances, h_wall_map, v_wall_map)
                 continue
 
             # wall_idx = region_idx[r_root]%len(wall_genes)
@@ -250,7 +290,7 @@ class MazeGenomeDecoder:
                 if r_depth==1:
                     v_point = (r_start[0]+passage_x, r_start[1])
                     h_point = (r_start[0], r_start[1]+wall_y)
-                    self.make_entrance(h_point, v_point, r_start, r_end, maze_size, path_map, h_wall_map, v_wall_map)
+                    self.make_entrance(h_point, v_point, r_start, r_end, path_distances, h_wall_map, v_wall_map)
 
             else:
                 wall_x = int((r_width-1)*wall_loc_rel)+1
@@ -283,31 +323,37 @@ class MazeGenomeDecoder:
                 if r_depth==1:
                     v_point = (r_start[0]+wall_x, r_start[1])
                     h_point = (r_start[0], r_start[1]+passage_y)
-                    self.make_entrance(h_point, v_point, r_start, r_end, maze_size, path_map, h_wall_map, v_wall_map)
+                    self.make_entrance(h_point, v_point, r_start, r_end, path_distances, h_wall_map, v_wall_map)
 
         return region_idx
 
-    def make_entrance(self, h_point, v_point, start_p, end_p, maze_size, path_map, h_wall_map, v_wall_map):
-        step = 1
-        # search pathway
-        while step<maze_size[0] or step<maze_size[1]:
-            # toward east
-            if h_point[0]+step<maze_size[0] and path_map[h_point[1], h_point[0]+step]>0:
-                v_wall_map[h_point[1], end_p[0]] = False
-                break
-            # toward west
-            if h_point[0]-step>=0 and path_map[h_point[1], h_point[0]-step]>0:
-                v_wall_map[h_point[1], start_p[0]] = False
-                break
-            # toward south
-            if v_point[1]+step<maze_size[1] and path_map[v_point[1]+step, v_point[0]]>0:
-                h_wall_map[end_p[1], v_point[0]] = False
-                break
-            # toward north
-            if v_point[1]-step>=0 and path_map[v_point[1]-step, v_point[0]]>0:
-                h_wall_map[start_p[1], v_point[0]] = False
-                break
-            step += 1
+    def get_entrance_lookup(self, maze_size, path_map):
+        # passed to make_entrance for every region
+        return get_path_distances(path_map)
+
+    def make_entrance(self, h_point, v_point, start_p, end_p, path_distances, h_wall_map, v_wall_map):
+        # open the side toward the nearest pathway.
+        # on a tie, east, west, south and north are preferred in this order
+        east, west, south, north = path_distances
+        steps = [
+            east[h_point[1]][h_point[0]],
+            west[h_point[1]][h_point[0]],
+            south[v_point[1]][v_point[0]],
+            north[v_point[1]][v_point[0]],
+        ]
+        found = [(step, direction) for direction,step in enumerate(steps) if step>0]
+        if len(found)==0:
+            return
+        _, direction = min(found)
+
+        if direction==0:
+            v_wall_map[h_point[1], end_p[0]] = False
+        elif direction==1:
+            v_wall_map[h_point[1], start_p[0]] = False
+        elif direction==2:
+            h_wall_map[end_p[1], v_point[0]] = False
+        else:
+            h_wall_map[start_p[1], v_point[0]] = False
 
     def surround_maze(self, h_wall_map, v_wall_map):
         h_wall_map[0,:] = True
@@ -317,31 +363,14 @@ class MazeGenomeDecoder:
 
 
     def extract_walls(self, maze_size, h_wall_map, v_wall_map):
-        walls = []
-        for h_i in range(maze_size[1]+1):
-            no_walls = list(np.where(h_wall_map[h_i,:]==False)[0])
-            no_walls.append(maze_size[0])
-            prev_i = 0
-            for now_i in no_walls:
-                if prev_i<now_i:
-                    walls.append(
-                        (prev_i*self.maze_scaler, h_i*self.maze_scaler, #start point
-                         now_i *self.maze_scaler, h_i*self.maze_scaler) #end point
-                    )
-                prev_i = now_i+1
-
-        for w_i in range(maze_size[0]+1):
-            no_walls = list(np.where(v_wall_map[:,w_i]==False)[0])
-            no_walls.append(maze_size[1])
-            prev_i = 0
-            for now_i in no_walls:
-                if prev_i<now_i:
-                    walls.append(
-                        (w_i*self.maze_scaler, prev_i*self.maze_scaler, #start point
-                         w_i*self.maze_scaler, now_i *self.maze_scaler) #end point
-                    )
-                prev_i = now_i+1
-
+        # horizontal walls row by row, then vertical walls column by column
+        h_rows, h_starts, h_ends = get_runs(h_wall_map)
+        v_cols, v_starts, v_ends = get_runs(v_wall_map.T)
+
+        s = self.maze_scaler
+        h_walls = np.stack([h_starts*s, h_rows*s, h_ends*s, h_rows*s], axis=1)
+        v_walls = np.stack([v_cols*s, v_starts*s, v_cols*s, v_ends*s], axis=1)
+        walls = [tuple(wall) for wall in np.vstack([h_walls, v_walls]).tolist()]
         return walls
 
     def plot(self, save_path, maze_size, path_map, h_wall_map, v_wall_map):
@@ -390,3 +419,43 @@ class MazeGenomeDecoder:
         ax.axis('off')
         plt.savefig(save_path, bbox_inches='tight')
         plt.cla()
+
+
+def first_true(mask):
+    # index of the first True in 1d mask, length of mask if there is no True
+    if mask.size==0:
+        return 0
+    idx = int(np.argmax(mask))
+    return idx if mask[idx] else mask.size
+
+def next_true_index(mask):
+    # index of the first True at or after each position along the last axis (length of the axis if there is no True)
+    size = mask.shape[-1]
+    index = np.where(mask, np.arange(size), size)
+    return np.minimum.accumulate(index[..., ::-1], axis=-1)[..., ::-1]
+
+def get_next_distance(mask):
+    # steps to the next True strictly after each position along the last axis (0 if there is no True)
+    size = mask.shape[-1]
+    next_index = np.full(mask.shape, size)
+    next_index[..., :-1] = next_true_index(mask)[..., 1:]
+    return np.where(next_index<size, next_index-np.arange(size), 0)
+
+def get_path_distances(path_map):
+    # steps to the nearest pathway cell toward east, west, south and north from each cell
+    on_path = path_map>0
+    east = get_next_distance(on_path)
+    west = get_next_distance(on_path[:, ::-1])[:, ::-1]
+    south = get_next_distance(on_path.T).T
+    north = get_next_distance(on_path[::-1].T).T[::-1]
+    # as nested lists, they are looked up one by one
+    return east.tolist(), west.tolist(), south.tolist(), north.tolist()
+
+def get_runs(wall_map):
+    # runs of True in each row: (row index, start, end) in row-major order
+    padded = np.zeros((wall_map.shape[0], wall_map.shape[1]+2), dtype=np.int8)
+    padded[:, 1:-1] = wall_map
+    diff = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(diff==1)
+    _, ends = np.nonzero(diff==-1)
+    return rows, starts, ends
@@ -0,0 +1,106 @@
+import numpy as np
+
+from maze_genome_decoder import MazeGenomeDecoder
+
+class ReferenceMazeGenomeDecoder(MazeGenomeDecoder):
+    """
+    MazeGenomeDecoder with the original loop implementations of
+    divide_maze, make_entrance and extract_walls.
+    Slow, kept to check that MazeGenomeDecoder decodes identical mazes.
+    """
+
+    def divide_maze(self, maze_size, path_map):
+        region_id = 1
+        region_map = np.zeros((maze_size[1], maze_size[0]), dtype=int)
+        region_map[path_map>0] = -1
+        regions = {}
+        for y,x in zip(*np.where(region_map==0)):
+            if region_map[y,x]!=0:
+                continue
+
+            cut_out = region_map[y:y+self.region_max_size[1], x:x+self.region_max_size[0]]
+
+            if np.all(cut_out==0):
+                r_height, r_width = cut_out.shape
+
+            else:
+                # width-first square
+                x_width = cut_out.shape[1] if np.all(cut_out[0,:]==0) else np.where(cut_out[0,:]!=0)[0][0]
+                x_height = cut_out.shape[0] if np.all(cut_out[:,:x_width]==0) else np.where(np.any(cut_out[:,:x_width]!=0,axis=1))[0][0]
+                # height-first square
+                y_height = cut_out.shape[0] if np.all(cut_out[:,0]==0) else np.where(cut_out[:,0]!=0)[0][0]
+                y_width = cut_out.shape[1] if np.all(cut_out[:y_height,:]==0) else np.where(np.any(cut_out[:y_height,:]!=0,axis=0))[0][0]
+
+                # chose the one with the lerger square area
+                if x_width*x_height > y_width*y_height:
+                    r_width = x_width
+                    r_height = x_height
+                else:
+                    r_width = y_width
+                    r_height = y_height
+
+            # map the region id
+            region_map[y:y+r_height, x:x+r_width] = region_id
+            regions[region_id] = {
+                'id': region_id,
+                'point': (x,y),
+                'size': (r_width, r_height),
+                'depth': 1,
+            }
+            region_id += 1
+
+        return regions
+
+    def get_entrance_lookup(self, maze_size, path_map):
+        return maze_size, path_map
+
+    def make_entrance(self, h_point, v_point, start_p, end_p, path_lookup, h_wall_map, v_wall_map):
+        maze_size, path_map = path_lookup
+        step = 1
+        # search pathway
+        while step<maze_size[0] or step<maze_size[1]:
+            # toward east
+            if h_point[0]+step<maze_size[0] and path_map[h_point[1], h_point[0]+step]>0:
+                v_wall_map[h_point[1], end_p[0]] = False
+                break
+            # toward west
+            if h_point[0]-step>=0 and path_map[h_point[1], h_point[0]-step]>0:
+                v_wall_map[h_point[1], start_p[0]] = False
+                break
+            # toward south
+            if v_point[1]+step<maze_size[1] and path_map[v_point[1]+step, v_point[0]]>0:
+                h_wall_map[end_p[1], v_point[0]] = False
+                break
+            # toward north
+            if v_point[1]-step>=0 and path_map[v_point[1]-step, v_point[0]]>0:
+                h_wall_map[start_p[1], v_point[0]] = False
+                break
+            step += 1
+
+    def extract_walls(self, maze_size, h_wall_map, v_wall_map):
+        walls = []
+        for h_i in range(maze_size[1]+1):
+            no_walls = list(np.where(h_wall_map[h_i,:]==False)[0])
+            no_walls.append(maze_size[0])
+            prev_i = 0
+            for now_i in no_walls:
+                if prev_i<now_i:
+                    walls.append(
+                        (prev_i*self.maze_scaler, h_i*self.maze_scaler, #start point
+                         now_i *self.maze_scaler, h_i*self.maze_scaler) #end point
+                    )
+                prev_i = now_i+1
+
+        for w_i in range(maze_size[0]+1):
+            no_walls = list(np.where(v_wall_map[:,w_i]==False)[0])
+            no_walls.append(maze_size[1])
+            prev_i = 0
+            for now_i in no_walls:
+                if prev_i<now_i:
+                    walls.append(
+                        (w_i*self.maze_scaler, prev_i*self.maze_scaler, #start point
+                         w_i*self.maze_scaler, now_i *self.maze_scaler) #end point
+                    )
+                prev_i = now_i+1
+
+        return walls
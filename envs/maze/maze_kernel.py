@@ -0,0 +1,259 @@
+import math
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+# activation functions of neat supported by the compiled kernel
+ACTIVATION_CODES = {
+    'sigmoid_activation': 0,
+    'tanh_activation': 1,
+    'sin_activation': 2,
+    'relu_activation': 3,
+    'identity_activation': 4,
+    'clamped_activation': 5,
+    'abs_activation': 6,
+}
+
+
+class CompiledController:
+    """
+    Feed-forward network flattened into arrays.
+    values[input_idx] are the inputs, node i is computed from values[link_src[link_ptr[i]:link_ptr[i+1]]],
+    and values[output_idx] are the outputs.
+    """
+    def __init__(self, network):
+        keys = {}
+        for key in list(network.input_nodes) + list(network.output_nodes):
+            keys.setdefault(key, len(keys))
+        for node, _, _, _, _, links in network.node_evals:
+            keys.setdefault(node, len(keys))
+            for i, _ in links:
+                keys.setdefault(i, len(keys))
+
+        self.num_values = len(keys)
+        self.input_idx = np.array([keys[k] for k in network.input_nodes], dtype=np.int64)
+        self.output_idx = np.array([keys[k] for k in network.output_nodes], dtype=np.int64)
+
+        node_idx, biases, responses, activations = [], [], [], []
+        link_ptr, link_src, link_weight = [0], [], []
+        for node, act_func, agg_func, bias, response, links in network.node_evals:
+            node_idx.append(keys[node])
+            biases.append(bias)
+            responses.append(response)
+            activations.append(ACTIVATION_CODES[act_func.__name__])
+            for i, w in links:
+                link_src.append(keys[i])
+                link_weight.append(w)
+            link_ptr.append(len(link_src))
+
+        self.node_idx = np.array(node_idx, dtype=np.int64)
+        self.biases = np.array(biases, dtype=np.float64)
+        self.responses = np.array(responses, dtype=np.float64)
+        self.activations = np.array(activations, dtype=np.int64)
+        self.link_ptr = np.array(link_ptr, dtype=np.int64)
+        self.link_src = np.array(link_src, dtype=np.int64)
+        self.link_weight = np.array(link_weight, dtype=np.float64)
+
+    @staticmethod
+    def is_compilable(network):
+        for _, act_func, agg_func, _, _, _ in network.node_evals:
+            if getattr(act_func, '__name__', None) not in ACTIVATION_CODES:
+                return False
+            if getattr(agg_func, '__name__', None) != 'sum_aggregation':
+                return False
+        return True
+
+
+def run_episode(maze, controller, timesteps, sample_interval=0, use_kernel=True):
+    """
+    Run one episode of the controller in the maze.
+    Uses the compiled kernel when numba is available, the controller is compilable
+    and the maze uses exact range finders, otherwise steps the maze environment in python.
+    Returns:
+        done: whether the agent found the exit.
+        location: final location of the agent.
+        samples: agent locations after every sample_interval steps (from the first step), shape (n, 2).
+        steps: number of steps executed.
+    """
+    if use_kernel and NUMBA_AVAILABLE and maze.sensor_resolution <= 0 and CompiledController.is_compilable(controller):
+        return run_episode_compiled(maze, CompiledController(controller), timesteps, sample_interval)
+
+    maze.reset()
+    done = False
+    steps = 0
+    samples = []
+    for i in range(timesteps):
+        obs = maze.get_observation()
+        action = controller.activate(obs)
+        done = maze.update(action)
+        steps += 1
+        if sample_interval>0 and i%sample_interval==0:
+            samples.append(maze.get_agent_location())
+        if done:
+            break
+
+    samples = np.array(samples, dtype=np.float64).reshape(-1,2)
+    return done, maze.get_agent_location(), samples, steps
+
+
+def run_episode_compiled(maze, compiled, timesteps, sample_interval=0):
+    # take agent parameters from a fresh agent, so defaults are the same as the python path
+    maze.reset()
+    agent = maze.agent
+
+    done, location, samples, steps = _episode_kernel(
+        maze.walls[:,0,:].copy(), maze.wall_vectors, maze.wall_sq_lengths,
+        np.asarray(maze.init_location, dtype=np.float64), float(maze.init_heading),
+        np.asarray(maze.exit_point, dtype=np.float64), float(maze.exit_range),
+        float(agent.radius), float(agent.range_finder_range),
+        agent.range_finder_angles.astype(np.float64), agent.radar_angles.astype(np.float64),
+        float(agent.max_speed), float(agent.max_angular_vel), float(agent.speed_scale), float(agent.angular_scale),
+        compiled.num_values, compiled.input_idx, compiled.output_idx, compiled.node_idx,
+        compiled.biases, compiled.responses, compiled.activations,
+        compiled.link_ptr, compiled.link_src, compiled.link_weight,
+        int(timesteps), int(sample_interval))
+    return bool(done), location, samples, int(steps)
+
+
+def _activate(code, z):
+    if code == 0:
+        z = max(-60.0, min(60.0, 5.0 * z))
+        return 1.0 / (1.0 + math.exp(-z))
+    elif code == 1:
+        z = max(-60.0, min(60.0, 2.5 * z))
+        return math.tanh(z)
+    elif code == 2:
+        z = max(-60.0, min(60.0, 5.0 * z))
+        return math.sin(z)
+    elif code == 3:
+        return z if z > 0.0 else 0.0
+    elif code == 4:
+        return z
+    elif code == 5:
+        return max(-1.0, min(1.0, z))
+    else:
+        return abs(z)
+
+
+def _sense(location, heading, starts, vectors, rf_range, rf_angles, radar_angles, exit_point, obs):
+    # range finders (same intersection test as Agent.update_rangefinder_sensors)
+    for k in range(rf_angles.shape[0]):
+        angle = (rf_angles[k] + heading) / 180 * np.pi
+        dc_x = rf_range * math.cos(angle)
+        dc_y = rf_range * math.sin(angle)
+        nearest = rf_range
+        for w in range(starts.shape[0]):
+            ac_x = starts[w,0] - location[0]
+            ac_y = starts[w,1] - location[1]
+            ba_x = vectors[w,0]
+            ba_y = vectors[w,1]
+            bot = ba_x * dc_y - ba_y * dc_x
+            if bot == 0:
+                continue
+            r = (ac_y * dc_x - ac_x * dc_y) / bot
+            s = (ac_y * ba_x - ac_x * ba_y) / bot
+            if r > 0 and r < 1 and s > 0 and s < 1:
+                dist = math.sqrt((ac_x + r * ba_x)**2 + (ac_y + r * ba_y)**2)
+                if dist < nearest:
+                    nearest = dist
+        obs[k] = nearest / rf_range
+
+    # radars (same as Agent.update_radars)
+    exit_angle = math.atan2(exit_point[0] - location[0], exit_point[1] - location[1]) % np.pi
+    offset = rf_angles.shape[0]
+    for k in range(radar_angles.shape[0]):
+        angle0 = (radar_angles[k,0] + heading) / 180 * np.pi
+        angle1 = (radar_angles[k,1] + heading) / 180 * np.pi
+        diff = (exit_angle - angle0) % (2 * np.pi)
+        obs[offset+k] = 1.0 if diff < angle1 - angle0 else 0.0
+
+
+def _collide(x, y, starts, vectors, sq_lengths, radius):
+    # same as MazeEnvironment.test_wall_collision
+    nearest = np.inf
+    for w in range(starts.shape[0]):
+        ca_x = x - starts[w,0]
+        ca_y = y - starts[w,1]
+        u = (ca_x * vectors[w,0] + ca_y * vectors[w,1]) / sq_lengths[w]
+        if u < 0 or u > 1:
+            dist = min(math.sqrt(ca_x**2 + ca_y**2),
+                       math.sqrt((ca_x - vectors[w,0])**2 + (ca_y - vectors[w,1])**2))
+        else:
+            dist = math.sqrt((u * vectors[w,0] - ca_x)**2 + (u * vectors[w,1] - ca_y)**2)
+        if dist < nearest:
+            nearest = dist
+    return nearest < radius
+
+
+def _episode_kernel(starts, vectors, sq_lengths, init_location, init_heading, exit_point, exit_range,
+                    radius, rf_range, rf_angles, radar_angles, max_speed, max_angular_vel, speed_scale, angular_scale,
+                    num_values, input_idx, output_idx, node_idx, biases, responses, activations,
+                    link_ptr, link_src, link_weight, timesteps, sample_interval):
+
+    location = init_location.copy()
+    heading = init_heading
+    speed = 0.0
+    angular_vel = 0.0
+
+    values = np.zeros(num_values)
+    obs = np.zeros(rf_angles.shape[0] + radar_angles.shape[0])
+    num_samples = (timesteps + sample_interval - 1) // sample_interval if sample_interval > 0 else 0
+    samples = np.zeros((num_samples, 2))
+
+    _sense(location, heading, starts, vectors, rf_range, rf_angles, radar_angles, exit_point, obs)
+
+    done = False
+    steps = 0
+    sample_num = 0
+    for i in range(timesteps):
+        # controller
+        for k in range(input_idx.shape[0]):
+            values[input_idx[k]] = obs[k]
+        for n in range(node_idx.shape[0]):
+            s = 0.0
+            for l in range(link_ptr[n], link_ptr[n+1]):
+                s += values[link_src[l]] * link_weight[l]
+            values[node_idx[n]] = _activate(activations[n], biases[n] + responses[n] * s)
+
+        # agent (same as MazeEnvironment.update)
+        angular_vel += (values[output_idx[0]] - 0.5) * angular_scale
+        speed += (values[output_idx[1]] - 0.5) * speed_scale
+        speed = min(max(speed, -max_speed), max_speed)
+        angular_vel = min(max(angular_vel, -max_angular_vel), max_angular_vel)
+
+        vel_x = math.cos(heading / 180 * np.pi) * speed
+        vel_y = math.sin(heading / 180 * np.pi) * speed
+        heading = (heading + angular_vel) % 360
+
+        new_x = location[0] + vel_x
+        new_y = location[1] + vel_y
+        if not _collide(new_x, new_y, starts, vectors, sq_lengths, radius):
+            location[0] = new_x
+            location[1] = new_y
+
+        _sense(location, heading, starts, vectors, rf_range, rf_angles, radar_angles, exit_point, obs)
+
+        distance = math.sqrt((location[0] - exit_point[0])**2 + (location[1] - exit_point[1])**2)
+        done = distance < exit_range
+        steps += 1
+
+        if sample_interval > 0 and i % sample_interval == 0:
+            samples[sample_num,0] = location[0]
+            samples[sample_num,1] = location[1]
+            sample_num += 1
+        if done:
+            break
+
+    return done, location, samples[:sample_num], steps
+
+
+if NUMBA_AVAILABLE:
+    _activate = njit(cache=True)(_activate)
+    _sense = njit(cache=True)(_sense)
+    _collide = njit(cache=True)(_collide)
+    _episode_kernel = njit(cache=True)(_episode_kernel)
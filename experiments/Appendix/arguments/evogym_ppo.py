@@ -73,6 +73,26 @@ def get_args():
         default=0.1, type=float,
         help='initial log std of action distribution (default: 0.1)'
     )
+    parser.add_argument(
+        '--early-stop-patience',
+        default=0, type=int,
+        help='stop when evaluation reward does not improve for this many evaluations (default: 0, never)'
+    )
+    parser.add_argument(
+        '--early-stop-min-delta',
+        default=0.0, type=float,
+        help='minimum reward increase counted as improvement (default: 0.0)'
+    )
+    parser.add_argument(
+        '--max-log-std',
+        default=2.0, type=float,
+        help='stop when mean log std of action distribution exceeds this (default: 2.0)'
+    )
+    parser.add_argument(
+        '--shared-memory',
+        action='store_true', default=False,
+        help='exchange env steps with env processes through shared memory (default: False)'
+    )
     parser.add_argument(
         '--probabilistic',
         action='store_true', default=False,
@@ -193,3 +213,48 @@ def get_figure_args():
     args = parser.parse_args()
 
     return args
+
+
+def get_benchmark_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark PPO rollout storage'
+    )
+
+    parser.add_argument(
+        '-p', '--num-processes',
+        default=4, type=int,
+        help='number of envs of rollout (default: 4)'
+    )
+    parser.add_argument(
+        '-s', '--steps',
+        default=256, type=int,
+        help='num steps to use in PPO (default: 256)'
+    )
+    parser.add_argument(
+        '-b','--num-mini-batch',
+        default=8, type=int,
+        help='number of batches for ppo (default: 8)'
+    )
+    parser.add_argument(
+        '-e', '--epochs',
+        default=8, type=int,
+        help='number of ppo epochs (default: 8)'
+    )
+    parser.add_argument(
+        '--obs-dim',
+        default=70, type=int,
+        help='observation size (default: 70)'
+    )
+    parser.add_argument(
+        '--act-dim',
+        default=10, type=int,
+        help='action size (default: 10)'
+    )
+    parser.add_argument(
+        '-i', '--iters',
+        default=50, type=int,
+        help='number of measured rollouts (default: 50)'
+    )
+    args = parser.parse_args()
+
+    return args
@@ -0,0 +1,74 @@
+import sys
+import os
+import time
+
+import numpy as np
+import torch
+from gym import spaces
+from stable_baselines3.common.buffers import RolloutBuffer
+
+
+CURR_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(CURR_DIR))
+
+LIB_DIR = os.path.join(ROOT_DIR, 'libs')
+sys.path.append(LIB_DIR)
+from ppo.rollout import Rollout
+
+
+from arguments.evogym_ppo import get_benchmark_args
+
+
+def run_buffer(buffer, steps, batch_size, epochs, data):
+    # times of (add, returns and advantages, minibatches) for one rollout
+    observations, actions, rewards, episode_starts, values, log_probs, last_values, dones = data
+
+    start = time.perf_counter()
+    buffer.reset()
+    for step in range(steps):
+        buffer.add(observations[step], actions[step], rewards[step], episode_starts[step], values[step], log_probs[step])
+    added = time.perf_counter()
+
+    buffer.compute_returns_and_advantage(last_values=last_values, dones=dones)
+    computed = time.perf_counter()
+
+    for epoch in range(epochs):
+        for samples in buffer.get(batch_size):
+            samples.observations.sum()
+    finished = time.perf_counter()
+
+    return added - start, computed - added, finished - computed
+
+
+def main():
+    args = get_benchmark_args()
+
+    num_envs = args.num_processes
+    observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(args.obs_dim,), dtype=np.float64)
+    action_space = spaces.Box(low=-1.0, high=1.0, shape=(args.act_dim,), dtype=np.float32)
+    batch_size = args.steps * num_envs // args.num_mini_batch
+
+    data = (
+        np.random.randn(args.steps, num_envs, args.obs_dim),
+        np.random.randn(args.steps, num_envs, args.act_dim).astype(np.float32),
+        np.random.randn(args.steps, num_envs).astype(np.float32),
+        np.random.rand(args.steps, num_envs) < 0.01,
+        torch.randn(args.steps, num_envs, 1),
+        torch.randn(args.steps, num_envs),
+        torch.randn(num_envs, 1),
+        np.random.rand(num_envs) < 0.01,
+    )
+
+    buffers = {
+        'sb3': RolloutBuffer(args.steps, observation_space, action_space, device='cpu', n_envs=num_envs),
+        'native': Rollout(args.steps, observation_space.shape, action_space.shape, num_envs),
+    }
+
+    for name, buffer in buffers.items():
+        run_buffer(buffer, args.steps, batch_size, args.epochs, data)
+        times = np.array([run_buffer(buffer, args.steps, batch_size, args.epochs, data) for _ in range(args.iters)])
+        add, gae, get = times.mean(axis=0) * 1000
+        print(f'{name: >6}:  add {add:7.3f} ms  gae {gae:7.3f} ms  minibatches {get:7.3f} ms  total {add+gae+get:7.3f} ms')
+
+if __name__=='__main__':
+    main()
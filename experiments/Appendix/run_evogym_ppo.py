@@ -38,6 +38,10 @@ class PpoConfig:
         self.lr_decay = True
         self.gae_lambda = 0.95
         self.init_log_std = args.init_log_std
+        self.early_stop_patience = args.early_stop_patience
+        self.early_stop_min_delta = args.early_stop_min_delta
+        self.max_log_std = args.max_log_std
+        self.shared_memory = args.shared_memory
 
 
 def main():
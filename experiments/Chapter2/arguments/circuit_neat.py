@@ -33,6 +33,17 @@ def get_args():
         default='mse', type=str,
         help='error function (default: mse, options: [mse, mae])'
     )
+    parser.add_argument(
+        '--mmap-data',
+        action='store_true', default=False,
+        help='memory-map the cached dataset, shared by evaluation processes (default: False)'
+    )
+
+    parser.add_argument(
+        '-b', '--batch-size',
+        default=0, type=int,
+        help='number of rows to score each generation on, shared by all genomes (default: 0, full data)'
+    )
 
     parser.add_argument(
         '-c', '--num-cores',
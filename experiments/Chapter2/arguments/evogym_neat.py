@@ -38,6 +38,11 @@ def get_args():
         default=1, type=int,
         help='evaluation times. if probabilistic task, need more. (default: 1)'
     )
+    parser.add_argument(
+        '--env-batch',
+        default=1, type=int,
+        help='number of genomes simulated together by each evaluation process (default: 1)'
+    )
     parser.add_argument(
         '-c', '--num-cores',
         default=4, type=int,
@@ -34,6 +34,18 @@ def get_args():
         help='limit of timestep for solving maze (default: 400)'
     )
 
+    parser.add_argument(
+        '--use-kernel',
+        action='store_true', default=False,
+        help='simulate maze episodes with the compiled kernel (needs numba, otherwise ignored) (default: False)'
+    )
+
+    parser.add_argument(
+        '--path-interval',
+        default=5, type=int,
+        help='interval of timesteps to record agent path for drawing, 1 and over (default: 5)'
+    )
+
     parser.add_argument(
         '-c', '--num-cores',
         default=4, type=int,
@@ -49,4 +61,7 @@ def get_args():
     if args.name is None:
         args.name = args.task
 
+    # the reporters draw the path recorded by the evaluator
+    assert args.path_interval >= 1, 'set path interval 1 and over.'
+
     return args
@@ -29,16 +29,27 @@ def main():
 
     decode_function = neat_cppn.FeedForwardNetwork.create
 
-    input_data, output_data = load_circuit(ROOT_DIR, args.task)
-    evaluator = CircuitEvaluator(input_data, output_data, error_type=args.error)
+    input_data, output_data = load_circuit(ROOT_DIR, args.task, mmap=args.mmap_data)
+    evaluator = CircuitEvaluator(input_data, output_data, error_type=args.error, batch_size=args.batch_size)
     evaluate_function = evaluator.evaluate_circuit
 
+    mini_batch = 0 < args.batch_size < input_data.shape[0]
     parallel = EvaluatorParallel(
         num_workers=args.num_cores,
         evaluate_function=evaluate_function,
-        decode_function=decode_function
+        decode_function=decode_function,
+        # mini-batch fitness is only comparable within a generation, so every genome is scored again
+        revaluate=mini_batch
     )
 
+    def fitness_function(genomes, config, generation):
+        parallel.evaluate(genomes, config, generation)
+        if mini_batch:
+            # species elites are kept unchanged by reproduction, so they are rescored on the full data
+            species = [s.members.keys() for s in pop.species.species.values()]
+            rescore_function = lambda targets: parallel.evaluate(targets, config, generation, evaluate_function=evaluator.evaluate_circuit_full)
+            evaluator.rescore_elites(genomes, species, max(1, config.reproduction_config.elitism), rescore_function)
+
 
     config_file = os.path.join(CURR_DIR, 'config', 'circuit_neat.cfg')
     custom_config = [
@@ -63,7 +74,7 @@ def main():
 
 
     try:
-        best_genome = pop.run(fitness_function=parallel.evaluate, n=args.generation)
+        best_genome = pop.run(fitness_function=fitness_function, n=args.generation)
 
         print()
         print('best circuit result:')
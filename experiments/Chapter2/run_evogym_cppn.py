@@ -10,12 +10,13 @@ ROOT_DIR = os.path.dirname(os.path.dirname(CURR_DIR))
 LIB_DIR = os.path.join(ROOT_DIR, 'libs')
 sys.path.append(LIB_DIR)
 import neat_cppn
-from parallel import EvaluatorParallel
+from parallel import EvaluatorParallel, WorkerResources
 from experiment_utils import initialize_experiment
 
 ENV_DIR = os.path.join(ROOT_DIR, 'envs', 'evogym')
 sys.path.append(ENV_DIR)
-from evaluator import EvogymStructureEvaluator
+from evaluator import EvogymStructureEvaluator, SuccessiveHalving
+import ppo_config
 from simulator import EvogymStructureSimulator, SimulateProcess
 from cppn_decoder import EvogymStructureDecoder
 from substrate import Substrate
@@ -30,7 +31,7 @@ def main():
 
     save_path = os.path.join(CURR_DIR, 'out', 'evogym_cppn', args.name)
 
-    initialize_experiment(args.name, save_path, args)
+    initialize_experiment(args.name, save_path, args, resume=args.resume)
 
 
     decoder = EvogymStructureDecoder(args.shape)
@@ -39,15 +40,38 @@ def main():
     constraint = EvogymStructureConstraint(decode_function)
     constraint_function = constraint.eval_constraint
 
-    evaluator = EvogymStructureEvaluator(args.task, save_path, args.ppo_iters, args.evaluation_interval, deterministic=not args.probabilistic)
-    evaluate_function = evaluator.evaluate_structure
+    evaluator = EvogymStructureEvaluator(args.task, save_path, args.ppo_iters, args.evaluation_interval, deterministic=not args.probabilistic,
+        warm_start=args.warm_start, warm_iters=args.warm_iters, skip_trained=args.resume,
+        early_stop_patience=args.early_stop_patience, early_stop_min_delta=args.early_stop_min_delta)
+    if args.ppo_batch > 1:
+        assert not args.warm_start and args.halving_iters == 0, '--ppo-batch can not be used with --warm-start or --halving-iters'
+        evaluate_function = evaluator.evaluate_structures
+    else:
+        evaluate_function = evaluator.evaluate_structure
+
+    resources = None
+    if args.limit_threads or args.pin_cores:
+        # each evaluation process runs ppo with num_processes env processes per robot
+        resources = WorkerResources(args.num_cores, processes_per_worker=ppo_config.num_processes*args.ppo_batch,
+            total_cores=args.core_budget, pin=args.pin_cores)
+        print(f'worker resources: {resources}')
 
     parallel = EvaluatorParallel(
         num_workers=args.num_cores,
         evaluate_function=evaluate_function,
-        decode_function=decode_function
+        decode_function=decode_function,
+        chunk_size=args.ppo_batch,
+        resources=resources
     )
 
+    if args.halving_iters > 0:
+        halving = SuccessiveHalving(parallel, evaluator, args.halving_iters, eta=args.halving_eta)
+        fitness_function = halving.evaluate
+    else:
+        def fitness_function(genomes, config, generation):
+            evaluator.set_parents(genomes)
+            parallel.evaluate(genomes, config, generation)
+
 
     config_file = os.path.join(CURR_DIR, 'config', 'evogym_cppn.cfg')
     custom_config = [
@@ -60,10 +84,17 @@ def main():
 
     pop = neat_cppn.Population(config, constraint_function=constraint_function)
 
+    checkpoint_file = os.path.join(save_path, 'checkpoint.pickle')
+    if args.resume:
+        pop.load_checkpoint(checkpoint_file)
+        print(f'resume from generation {pop.generation}')
+
     reporters = [
-        neat_cppn.SaveResultReporter(save_path),
+        neat_cppn.SaveResultReporter(save_path, resume=args.resume),
         neat_cppn.StdOutReporter(True),
     ]
+    if args.checkpoint_interval > 0:
+        reporters.append(neat_cppn.CheckpointReporter(pop, checkpoint_file, interval=args.checkpoint_interval))
     for reporter in reporters:
         pop.add_reporter(reporter)
 
@@ -84,9 +115,9 @@ def main():
 
 
     pop.run(
-        fitness_function=parallel.evaluate,
+        fitness_function=fitness_function,
         constraint_function=constraint_function,
-        n=args.generation
+        n=args.generation-pop.generation
     )
 
 if __name__=='__main__':
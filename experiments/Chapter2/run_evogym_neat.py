@@ -15,7 +15,7 @@ from experiment_utils import initialize_experiment
 
 ENV_DIR = os.path.join(ROOT_DIR, 'envs', 'evogym')
 sys.path.append(ENV_DIR)
-from evaluator import EvogymControllerEvaluator
+from evaluator import EvogymControllerEvaluator, EvogymControllerEvaluatorBatch
 from simulator import EvogymControllerSimulator, SimulateProcess
 from gym_utils import make_vec_envs, load_robot
 
@@ -36,13 +36,18 @@ def main():
 
     decode_function = neat_cppn.FeedForwardNetwork.create
 
-    evaluator = EvogymControllerEvaluator(args.task, robot, args.eval_num)
-    evaluate_function = evaluator.evaluate_controller
+    if args.env_batch > 1:
+        evaluator = EvogymControllerEvaluatorBatch(args.task, robot, args.eval_num)
+        evaluate_function = evaluator.evaluate_controllers
+    else:
+        evaluator = EvogymControllerEvaluator(args.task, robot, args.eval_num)
+        evaluate_function = evaluator.evaluate_controller
 
     parallel = EvaluatorParallel(
         num_workers=args.num_cores,
         evaluate_function=evaluate_function,
-        decode_function=decode_function
+        decode_function=decode_function,
+        chunk_size=args.env_batch
     )
 
 
@@ -32,7 +32,7 @@ def main():
 
     decode_function = neat_cppn.FeedForwardNetwork.create
 
-    evaluator = MazeControllerEvaluator(maze_env, args.timesteps)
+    evaluator = MazeControllerEvaluator(maze_env, args.timesteps, use_kernel=args.use_kernel, path_interval=args.path_interval)
     evaluate_function = evaluator.evaluate_agent
 
     parallel = EvaluatorParallel(
@@ -57,7 +57,7 @@ def main():
     reporters = [
         neat_cppn.SaveResultReporter(save_path),
         neat_cppn.StdOutReporter(True),
-        MazeReporterNEAT(maze_env, args.timesteps, figure_path, decode_function, args.generation, no_plot=args.no_plot)
+        MazeReporterNEAT(maze_env, figure_path, args.generation, no_plot=args.no_plot)
     ]
     for reporter in reporters:
         pop.add_reporter(reporter)
@@ -36,7 +36,7 @@ def main():
     decoder = MazeHyperDecoder(substrate, use_hidden=args.use_hidden)
     decode_function = decoder.decode
 
-    evaluator = MazeControllerEvaluatorNS(maze_env, args.timesteps)
+    evaluator = MazeControllerEvaluatorNS(maze_env, args.timesteps, use_kernel=args.use_kernel, path_interval=args.path_interval)
     evaluate_function = evaluator.evaluate_agent
 
     parallel = EvaluatorParallel(
@@ -66,7 +66,7 @@ def main():
     reporters = [
         ns_neat.SaveResultReporter(save_path),
         ns_neat.NoveltySearchReporter(True),
-        MazeReporterNS(maze_env, args.timesteps, figure_path, decode_function, args.generation, no_plot=args.no_plot)
+        MazeReporterNS(maze_env, figure_path, args.generation, no_plot=args.no_plot)
     ]
     for reporter in reporters:
         pop.add_reporter(reporter)
@@ -49,12 +49,77 @@ def get_args():
         action='store_true', default=False,
         help='evaluate robot on probabilistic action (default: False)'
     )
+    parser.add_argument(
+        '--warm-start',
+        action='store_true', default=False,
+        help='initialize PPO of a child robot from the controller of its parent (default: False)'
+    )
+    parser.add_argument(
+        '--warm-iters',
+        type=int,
+        help='learning iterations of PPO for warm started robots with the same body as the parent (default: same as ppo-iters)'
+    )
+    parser.add_argument(
+        '--early-stop-patience',
+        default=0, type=int,
+        help='stop PPO of a robot when evaluation reward does not improve for this many evaluations (default: 0, never)'
+    )
+    parser.add_argument(
+        '--early-stop-min-delta',
+        default=0.0, type=float,
+        help='minimum reward increase counted as improvement for early stopping (default: 0.0)'
+    )
+    parser.add_argument(
+        '--halving-iters',
+        default=0, type=int,
+        help='first budget of successive halving PPO, only the best robots are trained up to ppo-iters (default: 0, no halving)'
+    )
+    parser.add_argument(
+        '--halving-eta',
+        default=2, type=int,
+        help='successive halving keeps 1/eta robots and multiplies budget by eta each stage (default: 2)'
+    )
+    parser.add_argument(
+        '--ppo-batch',
+        default=1, type=int,
+        help='number of robots whose controllers are trained together in one batched PPO per process (default: 1)'
+    )
 
     parser.add_argument(
         '-c', '--num-cores',
         default=1, type=int,
         help='number of parallel evaluation processes (default: 1)'
     )
+    parser.add_argument(
+        '--limit-threads',
+        action='store_true', default=False,
+        help='limit torch and BLAS threads of each evaluation process to its share of the core budget (default: False)'
+    )
+    parser.add_argument(
+        '--core-budget',
+        default=0, type=int,
+        help='number of cores shared by evaluation processes and their ppo env processes (default: 0, all available cores)'
+    )
+    parser.add_argument(
+        '--pin-cores',
+        action='store_true', default=False,
+        help='pin each evaluation process to its share of the cores, implies --limit-threads (default: False)'
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true', default=False,
+        help='continue the experiment from its last checkpoint, reusing robots already trained (default: False)'
+    )
+    parser.add_argument(
+        '--checkpoint-interval',
+        default=1, type=int,
+        help='generations between checkpoints of the population, 0 for no checkpoints (default: 1)'
+    )
+    parser.add_argument(
+        '--plot-interval',
+        default=1, type=int,
+        help='generation interval to draw behavioral descriptor map (default: 1)'
+    )
     parser.add_argument(
         '--no-plot',
         action='store_true', default=False,
@@ -67,6 +67,29 @@ def get_args():
         help='maze number to evaluate in one iteration (default: 10)'
     )
 
+    parser.add_argument(
+        '--outcome-cache',
+        default=100000, type=int,
+        help='maximum number of (agent, maze) outcomes to keep for reuse (default: 100000, 0 means no cache)'
+    )
+    parser.add_argument(
+        '--decode-cache',
+        default=0, type=int,
+        help='maximum number of decoded mazes to keep by genome content, reused by offsprings identical to a known maze (default: 0, it means no cache)'
+    )
+
+    parser.add_argument(
+        '--use-kernel',
+        action='store_true', default=False,
+        help='simulate maze episodes with the compiled kernel (needs numba, otherwise ignored) (default: False)'
+    )
+
+    parser.add_argument(
+        '--sensor-resolution',
+        default=0, type=float,
+        help='cell size of the wall raster for approximate range finders, 0 means exact range finders (default: 0)'
+    )
+
     parser.add_argument(
         '-c', '--num-cores',
         default=4, type=int,
@@ -161,6 +184,12 @@ def get_bootstrap_args():
         help='nn output scaler for angular velocity (default: 3.0)'
     )
 
+    parser.add_argument(
+        '--use-kernel',
+        action='store_true', default=False,
+        help='simulate maze episodes with the compiled kernel (needs numba, otherwise ignored) (default: False)'
+    )
+
     parser.add_argument(
         '-c', '--num-cores',
         default=4, type=int,
@@ -223,3 +252,29 @@ def get_figure_args():
     assert args.name is not None, 'argumented error: input "{experiment name}"'
 
     return args
+
+
+def get_check_decoder_args():
+    parser = argparse.ArgumentParser(
+        description='check that maze genome decoder gives the same mazes as the reference decoder'
+    )
+
+    parser.add_argument(
+        '-l', '--lineages',
+        default=100, type=int,
+        help='number of maze genomes mutated from a new genome (default: 100)'
+    )
+    parser.add_argument(
+        '-m', '--mutations',
+        default=50, type=int,
+        help='number of mutations of each lineage, decoded after every mutation (default: 50)'
+    )
+    parser.add_argument(
+        '-s', '--seed',
+        default=0, type=int,
+        help='random seed (default: 0)'
+    )
+
+    args = parser.parse_args()
+
+    return args
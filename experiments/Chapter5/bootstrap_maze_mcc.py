@@ -108,7 +108,7 @@ def main():
 
         maze_env, timesteps = MazeDecoder.decode(maze_genome, mcc_config, save=os.path.join(save_path, f'maze{maze_genome.key+1}.jpg'))
 
-        evaluator = MazeControllerEvaluatorNS(maze_env, timesteps)
+        evaluator = MazeControllerEvaluatorNS(maze_env, timesteps, use_kernel=args.use_kernel)
         parallel = EvaluatorParallel(
             num_workers=args.num_cores,
             evaluate_function=evaluator.evaluate_agent,
@@ -0,0 +1,77 @@
+import sys
+import os
+import random
+import numpy as np
+
+
+CURR_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(CURR_DIR))
+
+LIB_DIR = os.path.join(ROOT_DIR, 'libs')
+sys.path.append(LIB_DIR)
+import mcc
+
+ENV_DIR = os.path.join(ROOT_DIR, 'envs', 'maze')
+sys.path.append(ENV_DIR)
+from maze_genome import MazeGenome
+from maze_genome_decoder import MazeGenomeDecoder
+from maze_genome_decoder_reference import ReferenceMazeGenomeDecoder
+
+
+from arguments.maze_mcc import get_check_decoder_args
+
+
+def decode(decoder, genome):
+    pathway_map, h_wall_map, v_wall_map, path_length = decoder.make_maps(genome)
+    walls = decoder.extract_walls(genome.maze_size, h_wall_map, v_wall_map)
+    return pathway_map, h_wall_map, v_wall_map, path_length, genome.subregion_num, walls
+
+
+def check_genome(decoder, reference, genome):
+    pathway_map, h_wall_map, v_wall_map, path_length, subregion_num, walls = decode(decoder, genome)
+    ref_pathway_map, ref_h_wall_map, ref_v_wall_map, ref_path_length, ref_subregion_num, ref_walls = decode(reference, genome)
+
+    assert np.array_equal(pathway_map, ref_pathway_map), 'pathway differs'
+    # entrances are the openings made in region walls
+    assert np.array_equal(h_wall_map, ref_h_wall_map), 'horizontal walls or entrances differ'
+    assert np.array_equal(v_wall_map, ref_v_wall_map), 'vertical walls or entrances differ'
+    assert path_length == ref_path_length, 'path length differs'
+    assert subregion_num == ref_subregion_num, 'subregion number differs'
+    assert walls == ref_walls, 'extracted walls differ'
+
+
+def main():
+    args = get_check_decoder_args()
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+
+    config_file = os.path.join(CURR_DIR, 'config', 'maze_mcc.cfg')
+    config = mcc.make_config(mcc.DefaultGenome, MazeGenome, config_file)
+    genome_config = config.genome2_config
+
+    decoder = MazeGenomeDecoder(genome_config)
+    reference = ReferenceMazeGenomeDecoder(genome_config)
+
+    checked = 0
+    max_size = [0, 0]
+    for key in range(args.lineages):
+        genome = MazeGenome(key)
+        genome.configure_new(genome_config)
+        for _ in range(args.mutations+1):
+            try:
+                check_genome(decoder, reference, genome)
+            except AssertionError:
+                print(f'lineage {key}: decoded maze differs from the reference')
+                print(f'maze size: {genome.maze_size}')
+                print('wall:', ' '.join(str(wall_gene) for wall_gene in genome.wall_genes))
+                print('path:', ' '.join(str(path_gene) for path_gene in genome.path_genes))
+                raise
+            checked += 1
+            max_size = [max(max_size[0], genome.maze_size[0]), max(max_size[1], genome.maze_size[1])]
+            genome.mutate(genome_config)
+
+    print(f'{checked} mazes (up to {max_size[0]}x{max_size[1]} cells) decoded identically to the reference')
+
+if __name__=='__main__':
+    main()
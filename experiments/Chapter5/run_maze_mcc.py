@@ -1,5 +1,6 @@
 import sys
 import os
+from functools import partial
 import numpy as np
 
 
@@ -16,6 +17,8 @@ ENV_DIR = os.path.join(ROOT_DIR, 'envs', 'maze')
 sys.path.append(ENV_DIR)
 from maze_genome import MazeGenome
 from maze_genome_decoder import MazeGenomeDecoder
+from maze_kernel import run_episode
+from maze_environment_numpy import compare_sensor_modes
 
 
 from arguments.maze_mcc import get_args
@@ -37,17 +40,10 @@ class MazeReporter(mcc.BaseReporter):
         print(f'nn connections   :  {np.min(nn_conns): =7.1f}  {np.mean(nn_conns): =7.1f}  {np.max(nn_conns): =7.1f}')
 
 
-def simulate_maze(controller, maze_phenome, generation):
+def simulate_maze(controller, maze_phenome, generation, use_kernel=False):
     maze, timesteps = maze_phenome
-    maze.reset()
-    done = False
-    for i in range(timesteps):
-        obs = maze.get_observation()
-        action = controller.activate(obs)
-        done = maze.update(action)
-        if done:
-            break
-    return done
+    done, _, _, steps = run_episode(maze, controller, timesteps, use_kernel=use_kernel)
+    return done, steps
 
 
 def main():
@@ -80,6 +76,7 @@ def main():
     maze_config = {
         'exit_range': bootstrap_args['exit_range'],
         'init_heading': 45,
+        'sensor_resolution': args.sensor_resolution,
     }
     agent_config = {
         'radius': bootstrap_args['radius'],
@@ -89,16 +86,20 @@ def main():
         'speed_scale': bootstrap_args['speed_scale'],
         'angular_scale': bootstrap_args['angular_scale'],
     }
-    MazeDecoder = MazeGenomeDecoder(config.genome2_config, maze_kwargs=maze_config, agent_kwargs=agent_config)
+    MazeDecoder = MazeGenomeDecoder(config.genome2_config, maze_kwargs=maze_config, agent_kwargs=agent_config, cache_size=args.decode_cache)
     maze_decode_function = MazeDecoder.decode
 
     agent_decode_function = mcc.FeedForwardNetwork.create
 
+    outcome_matrix = mcc.OutcomeMatrix(max_size=args.outcome_cache) if args.outcome_cache > 0 else None
+
     evaluator = MCCEvaluatorParallel(
         num_workers=args.num_cores,
-        evaluate_function=simulate_maze,
+        evaluate_function=partial(simulate_maze, use_kernel=args.use_kernel),
         decode_function1=agent_decode_function,
         decode_function2=maze_decode_function,
+        outcome_matrix=outcome_matrix,
+        identify_function2=MazeGenome.get_content_key,
     )
 
 
@@ -109,6 +110,13 @@ def main():
 
     pop = mcc.Population(config, agent_bootstrap_file, maze_bootstrap_file)
 
+    if args.sensor_resolution > 0:
+        maze_genome = next(iter(pop.genome2_pop.values()))
+        maze_env, _ = maze_decode_function(maze_genome, config.genome2_config)
+        accuracy = compare_sensor_modes(maze_env, args.sensor_resolution, seed=0)
+        print(f'raster range finder error (resolution {args.sensor_resolution}): '
+              f'mean {accuracy["mean_error"]:.4f}  p99 {accuracy["p99_error"]:.4f}  max {accuracy["max_error"]:.4f}')
+
     reporters = [
         mcc.SaveResultReporter(save_path, 'agent', 'maze', pop.genome1_pop, pop.genome2_pop),
         mcc.MCCReporter('agent', 'maze', print_genome2=args.print_maze),
@@ -120,5 +128,10 @@ def main():
 
     pop.run(evaluate_function=evaluator.evaluate)
 
+    if outcome_matrix is not None:
+        outcome_file = os.path.join(save_path, 'outcomes.csv')
+        outcome_matrix.save(outcome_file, genome1_name='agent', genome2_name='maze')
+        print(f'pair outcomes: {len(outcome_matrix)} recorded  {outcome_matrix.hits} reused')
+
 if __name__=='__main__':
     main()
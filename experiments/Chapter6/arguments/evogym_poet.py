@@ -130,6 +130,21 @@ def get_args():
         default=4, type=int,
         help='how many training CPU processes to use (default: 4)'
     )
+    parser.add_argument(
+        '--limit-threads',
+        action='store_true', default=False,
+        help='limit torch and BLAS threads of the main process and each training process to their share of the core budget (default: False)'
+    )
+    parser.add_argument(
+        '--core-budget',
+        default=0, type=int,
+        help='number of cores shared by the main process with its ppo env processes (num-processes cores) and the training processes (default: 0, all available cores)'
+    )
+    parser.add_argument(
+        '--pin-cores',
+        action='store_true', default=False,
+        help='pin the main process and each training process to their share of the cores, implies --limit-threads (default: False)'
+    )
 
     parser.add_argument(
         '--reset-pool',
@@ -9,6 +9,7 @@ LIB_DIR = os.path.join(ROOT_DIR, 'libs')
 sys.path.append(LIB_DIR)
 import neat_cppn
 from experiment_utils import initialize_experiment
+from parallel import WorkerResources
 
 ENV_DIR = os.path.join(ROOT_DIR, 'envs', 'evogym')
 sys.path.append(ENV_DIR)
@@ -61,6 +62,14 @@ def main():
     else:
         maximum_reward = args.width/10
 
+    resources = None
+    if args.limit_threads or args.pin_cores:
+        # workers run transfer and evaluation with in-process envs,
+        # the main process trains the niches with num_processes env processes
+        resources = WorkerResources(args.num_cores, total_cores=args.core_budget, pin=args.pin_cores,
+            main_processes=args.num_processes)
+        print(f'worker resources: {resources}')
+
     poet_pop = POET(
         env_config,
         opt_config,
@@ -79,7 +88,8 @@ def main():
         clip_reward_upper=maximum_reward,
         novelty_knn=1,
         novelty_threshold=0.1,
-        reset_pool=args.reset_pool)
+        reset_pool=args.reset_pool,
+        resources=resources)
 
     poet_pop.initialize_niche()
     poet_pop.optimize(iterations=args.iteration)
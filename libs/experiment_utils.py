@@ -3,7 +3,12 @@ import shutil
 import json
 
 
-def initialize_experiment(experiment_name, save_path, args):
+def initialize_experiment(experiment_name, save_path, args, resume=False):
+    if resume:
+        # continue in the existing directory, keeping the arguments it was started with
+        assert os.path.exists(save_path), f'experiment ({experiment_name}) to resume does not exist'
+        return
+
     try:
         os.makedirs(save_path)
     except:
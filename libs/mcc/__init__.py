@@ -2,3 +2,4 @@ from neat_cppn import *
 from .population import Population
 from .config import make_config
 from .reporting import BaseReporter, SaveResultReporter, MCCReporter
+from .outcome import OutcomeMatrix
@@ -0,0 +1,54 @@
+import csv
+from collections import OrderedDict
+
+
+class OutcomeMatrix:
+    """
+    Sparse record of (genome1, genome2) pair outcomes: pair -> (success, steps).
+    Pairs are identified by phenotype identity (genome key by default), so a clone whose
+    content equals an already evaluated genome reuses its results.
+    Only valid for deterministic evaluation. The least recently used pairs are discarded
+    when the matrix exceeds max_size.
+    """
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self.outcomes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    def __contains__(self, pair):
+        return pair in self.outcomes
+
+    def get(self, id1, id2):
+        outcome = self.outcomes.get((id1, id2), None)
+        if outcome is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.outcomes.move_to_end((id1, id2))
+        return outcome
+
+    def set(self, id1, id2, success, steps):
+        self.outcomes[(id1, id2)] = (bool(success), int(steps))
+        self.outcomes.move_to_end((id1, id2))
+        while len(self.outcomes) > self.max_size:
+            self.outcomes.popitem(last=False)
+
+    def items(self):
+        return self.outcomes.items()
+
+    def get_row(self, id1):
+        return {id2: outcome for (key1, id2), outcome in self.outcomes.items() if key1 == id1}
+
+    def get_column(self, id2):
+        return {id1: outcome for (id1, key2), outcome in self.outcomes.items() if key2 == id2}
+
+    def save(self, filename, genome1_name='genome1', genome2_name='genome2'):
+        with open(filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow([genome1_name, genome2_name, 'success', 'steps'])
+            for (id1, id2), (success, steps) in self.outcomes.items():
+                writer.writerow([id1, id2, int(success), steps])
@@ -1,6 +1,6 @@
 from neat_cppn import *
 from .population import Population
 from .behavioral_descriptor import LinerBehavioralDescriptor
-from .reporting import BaseReporter, SaveResultReporter, MapElitesReporter
+from .reporting import BaseReporter, SaveResultReporter, MapElitesReporter, CheckpointReporter
 from .drawer import BDDrawer
 from .config import make_config
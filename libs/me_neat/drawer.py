@@ -1,37 +1,128 @@
 import os
+import atexit
+import queue
+import threading
 import numpy as np
 
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
 from .reporting import BaseReporter
 
 
+class BDMapRenderer(threading.Thread):
+    """
+    Background thread that turns bd map snapshots into jpg files.
+    Uses its own Agg figure (no pyplot state), so it never touches the main thread's windows.
+    When rendering can not keep up, the oldest waiting snapshot is dropped.
+    """
+    def __init__(self, figure_path, axis1, axis2, bd1_name, bd2_name, queue_size=1, keep_image=False):
+        super().__init__(daemon=True)
+        self.figure_path = figure_path
+        self.axis1 = axis1
+        self.axis2 = axis2
+        self.keep_image = keep_image
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.latest_image = None
+        self.closed = False
+
+        self.fig = Figure(figsize=(5*1.2, 5))
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot(111)
+        self.ax.set_title('behavioral descriptor 2d map')
+        self.ax.set_xlabel(bd1_name)
+        self.ax.set_ylabel(bd2_name)
+
+    def submit(self, generation, bd_map, vmin, vmax):
+        frame = (generation, bd_map, vmin, vmax)
+        while True:
+            try:
+                self.queue.put_nowait(frame)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.queue.task_done()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.is_alive():
+            self.queue.put(None)
+            self.join()
+
+    def run(self):
+        while True:
+            frame = self.queue.get()
+            try:
+                if frame is None:
+                    break
+                self.render(*frame)
+            finally:
+                self.queue.task_done()
+
+    def render(self, generation, bd_map, vmin, vmax):
+        cmap = plt.get_cmap('gist_earth')
+        pcm = self.ax.pcolormesh(self.axis1, self.axis2, bd_map, cmap=cmap, vmin=vmin, vmax=vmax)
+        cb = self.fig.colorbar(pcm, ax=self.ax)
+
+        filename = os.path.join(self.figure_path, f'{generation}.jpg')
+        self.fig.savefig(filename, bbox_inches='tight')
+
+        if self.keep_image:
+            self.fig.canvas.draw()
+            self.latest_image = np.asarray(self.fig.canvas.buffer_rgba()).copy()
+
+        cb.remove()
+        pcm.remove()
+
+
 class BDDrawer(BaseReporter):
-    def __init__(self, save_path, bd1, bd2, no_plot=False):
+    def __init__(self, save_path, bd1, bd2, no_plot=False, interval=1, queue_size=1, generations=None):
         self.save_path = save_path
         self.no_plot = no_plot
+        self.interval = interval
+        # the last generation of the run is drawn whatever the interval
+        self.generations = generations
 
         self.figure_path = os.path.join(self.save_path, 'bd_map')
         os.makedirs(self.figure_path, exist_ok=True)
 
-        self.fig = None
-        self.ax = None
-        self._init_figure()
-
         self.bd1_name = None
         self.bd2_name = None
         self.axis_bd1 = None
         self.axis_bd2 = None
         self._set_bd_to_figure(bd1, bd2)
 
+        self.renderer = BDMapRenderer(
+            self.figure_path, self.axis1, self.axis2, bd1.name, bd2.name,
+            queue_size=queue_size, keep_image=not no_plot)
+        self.renderer.start()
+        atexit.register(self.renderer.close)
+
+        self.fig = None
+        self.ax = None
+        self.image = None
+
     def __del__(self):
-        plt.clf()
-        plt.close('all')
+        self.close()
+
+    def close(self):
+        self.renderer.close()
+        if self.fig is not None:
+            plt.close(self.fig)
+            self.fig = None
 
     def _init_figure(self):
         self.fig, self.ax = plt.subplots(figsize=(5*1.2, 5))
-
-        self.ax.set_title('behavioral descriptor 2d map')
+        self.ax.set_axis_off()
 
     def _set_bd_to_figure(self, bd1, bd2):
         self.bd1_name = bd1.name
@@ -39,13 +130,13 @@ class BDDrawer(BaseReporter):
 
         self.axis2, self.axis1 = np.meshgrid(np.array(bd2.bins), np.array(bd1.bins))
 
-        self.ax.set_xlabel(bd1.name)
-        self.ax.set_ylabel(bd2.name)
-
     def start_generation(self, generation):
         self.generation = generation
 
     def end_generation(self, config, population):
+        last = self.generations is not None and self.generation == self.generations-1
+        if self.generation % self.interval != 0 and not last:
+            return
 
         bd_map = np.full(self.axis1.shape, -np.inf)
         vmin = 0
@@ -58,19 +149,23 @@ class BDDrawer(BaseReporter):
             vmax = max(vmax, genome.fitness)
         vmax += (vmax-vmin)*0.05
 
-        cmap = plt.get_cmap('gist_earth')
-        pcm = self.ax.pcolormesh(self.axis1, self.axis2, bd_map, cmap=cmap, vmin=vmin, vmax=vmax)
-        cb = self.fig.colorbar(pcm, ax=self.ax)
-
-        filename = os.path.join(self.figure_path, f'{self.generation}.jpg')
-        self.fig.savefig(filename, bbox_inches='tight')
+        self.renderer.submit(self.generation, bd_map, vmin, vmax)
 
         if not self.no_plot:
-            plt.pause(0.1)
+            self._show_latest()
 
-        cb.remove()
-        pcm.remove()
+    def _show_latest(self):
+        # show the last image finished by the renderer, never wait for the current one
+        image = self.renderer.latest_image
+        if image is None:
+            return
+
+        if self.fig is None:
+            self._init_figure()
+            self.image = self.ax.imshow(image)
+        else:
+            self.image.set_data(image)
+        plt.pause(0.001)
 
     def found_solution(self, config, generation, best):
-        plt.clf()
-        plt.close('all')
+        self.close()
@@ -1,6 +1,8 @@
 
 import numpy as np
 
+from neat_cppn.checkpoint import get_indexer_value, set_indexer_value, get_random_state, set_random_state, save_checkpoint, load_checkpoint
+
 from .reproduction import Reproduction
 from .reporting import ReporterSet
 
@@ -31,6 +33,30 @@ class Population:
     def remove_reporter(self, reporter):
         self.reporters.remove(reporter)
 
+    def save_checkpoint(self, filename):
+        """
+        Save the state to continue evolution from the current generation (before its reproduction):
+        archive, key indexers and random states. Reporters are not saved.
+        """
+        state = {
+            'generation': self.generation,
+            'population': self.population,
+            'best_genome': self.best_genome,
+            'genome_indexer': get_indexer_value(self.reproduction, 'indexer'),
+            'node_indexer': get_indexer_value(self.config.genome_config, 'node_indexer'),
+            'random_state': get_random_state(),
+        }
+        save_checkpoint(filename, state)
+
+    def load_checkpoint(self, filename):
+        state = load_checkpoint(filename)
+        self.generation = state['generation']
+        self.population = state['population']
+        self.best_genome = state['best_genome']
+        set_indexer_value(self.reproduction, 'indexer', state['genome_indexer'])
+        set_indexer_value(self.config.genome_config, 'node_indexer', state['node_indexer'])
+        set_random_state(state['random_state'])
+
     def run(self, fitness_function, constraint_function=None, n=None):
         if n is None:
             n = self.config.generation - self.generation
@@ -5,6 +5,8 @@ import csv
 import pickle
 import numpy as np
 
+from neat_cppn.checkpoint import truncate_history
+
 class ReporterSet:
     def __init__(self):
         self.reporters = []
@@ -48,8 +50,10 @@ class BaseReporter:
 
 class SaveResultReporter(BaseReporter):
 
-    def __init__(self, save_path, bd_names):
+    def __init__(self, save_path, bd_names, resume=False):
         self.save_path = save_path
+        # when resuming, history files are kept and cut back to the first generation run again
+        self.resume = resume
         self.history_pop_file = os.path.join(self.save_path, 'history_pop.csv')
         self.history_pop_header = ['generation', 'id'] + bd_names + ['fitness', 'parent']
         self.history_fitness_file = os.path.join(self.save_path, 'history_fitness.csv')
@@ -59,6 +63,9 @@ class SaveResultReporter(BaseReporter):
         self.genome_path = os.path.join(self.save_path, 'genome')
         os.makedirs(self.genome_path, exist_ok=True)
 
+        if resume:
+            return
+
         with open(self.history_pop_file, 'w') as f:
             writer = csv.DictWriter(f, fieldnames=self.history_pop_header)
             writer.writeheader()
@@ -68,6 +75,10 @@ class SaveResultReporter(BaseReporter):
             writer.writeheader()
 
     def start_generation(self, generation):
+        if self.resume:
+            truncate_history(self.history_pop_file, generation)
+            truncate_history(self.history_fitness_file, generation)
+            self.resume = False
         self.generation = generation
 
     def post_evaluate(self, config, offsprings, best_genome):
@@ -99,6 +110,20 @@ class SaveResultReporter(BaseReporter):
             pickle.dump(best_genome, f)
 
 
+class CheckpointReporter(BaseReporter):
+    """
+    Save a checkpoint of the population at the start of every interval-th generation.
+    """
+    def __init__(self, population, filename, interval=1):
+        self.population = population
+        self.filename = filename
+        self.interval = interval
+
+    def start_generation(self, generation):
+        if generation % self.interval == 0:
+            self.population.save_checkpoint(self.filename)
+
+
 class MapElitesReporter(BaseReporter):
 
     def __init__(self):
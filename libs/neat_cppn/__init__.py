@@ -2,7 +2,7 @@ from neat import *
 from .genome import DefaultGenome
 from .population import Population
 from .reproduction import DefaultReproduction
-from .reporting import BaseReporter, SaveResultReporter
+from .reporting import BaseReporter, SaveResultReporter, CheckpointReporter
 from .config import make_config
 from .feedforward import FeedForwardNetwork
 from .cppn_decoder import BaseCPPNDecoder, BaseHyperDecoder
@@ -0,0 +1,64 @@
+import os
+import csv
+import pickle
+import random
+import itertools
+
+import numpy as np
+
+
+def get_indexer_value(obj, name):
+    # next value of an itertools.count attribute (None if not set), without consuming it
+    indexer = getattr(obj, name)
+    if indexer is None:
+        return None
+    value = next(indexer)
+    setattr(obj, name, itertools.count(value))
+    return value
+
+def set_indexer_value(obj, name, value):
+    setattr(obj, name, None if value is None else itertools.count(value))
+
+
+def get_random_state():
+    return {'random': random.getstate(), 'numpy': np.random.get_state()}
+
+def set_random_state(state):
+    random.setstate(state['random'])
+    np.random.set_state(state['numpy'])
+
+
+def save_checkpoint(filename, state):
+    """
+    Pickle state to a temporary file and move it over filename,
+    so an interrupted save keeps the previous checkpoint.
+    """
+    tmp_file = filename + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, filename)
+
+def load_checkpoint(filename):
+    with open(filename, 'rb') as f:
+        return pickle.load(f)
+
+
+def truncate_history(filename, generation):
+    # drop rows of generations from generation on, which are run again after resuming
+    if not os.path.exists(filename):
+        return
+    with open(filename, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        rows = [row for row in reader if len(row) > 0 and int(row[0]) < generation]
+    if header is None:
+        return
+
+    tmp_file = filename + '.tmp'
+    with open(tmp_file, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    os.replace(tmp_file, filename)
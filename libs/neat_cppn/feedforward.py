@@ -1,10 +1,80 @@
+import numpy as np
+
 from neat.graphs import feed_forward_layers
 from neat.nn import FeedForwardNetwork
 from neat.activations import sigmoid_activation
 from neat.aggregations import sum_aggregation
 
+
+# numpy versions of the neat activation functions, used by activate_batch
+BATCH_ACTIVATIONS = {
+    'sigmoid_activation': lambda z: 1.0 / (1.0 + np.exp(-np.clip(5.0 * z, -60.0, 60.0))),
+    'tanh_activation': lambda z: np.tanh(np.clip(2.5 * z, -60.0, 60.0)),
+    'sin_activation': lambda z: np.sin(np.clip(5.0 * z, -60.0, 60.0)),
+    'gauss_activation': lambda z: np.exp(-5.0 * np.clip(z, -3.4, 3.4)**2),
+    'relu_activation': lambda z: np.maximum(z, 0.0),
+    'softplus_activation': lambda z: 0.2 * np.log1p(np.exp(np.clip(5.0 * z, -60.0, 60.0))),
+    'identity_activation': lambda z: z,
+    'clamped_activation': lambda z: np.clip(z, -1.0, 1.0),
+    'log_activation': lambda z: np.log(np.maximum(z, 1e-7)),
+    'exp_activation': lambda z: np.exp(np.clip(z, -60.0, 60.0)),
+    'abs_activation': lambda z: np.abs(z),
+    'hat_activation': lambda z: np.maximum(0.0, 1 - np.abs(z)),
+    'square_activation': lambda z: z ** 2,
+    'cube_activation': lambda z: z ** 3,
+}
+
+# numpy versions of the neat aggregation functions, applied to (batch, inputs) arrays
+BATCH_AGGREGATIONS = {
+    'product_aggregation': lambda x: np.prod(x, axis=1),
+    'max_aggregation': lambda x: np.max(x, axis=1),
+    'min_aggregation': lambda x: np.min(x, axis=1),
+    'maxabs_aggregation': lambda x: x[np.arange(x.shape[0]), np.argmax(np.abs(x), axis=1)],
+    'median_aggregation': lambda x: np.median(x, axis=1),
+    'mean_aggregation': lambda x: np.mean(x, axis=1),
+}
+
+
 class FeedForwardNetwork(FeedForwardNetwork):
 
+    def activate_batch(self, inputs):
+        """
+        Forward pass over all rows of inputs at once.
+        Arguments:
+            inputs: array of shape (batch, num_inputs).
+        Returns:
+            array of shape (batch, num_outputs), equal to stacking activate() of each row.
+        """
+        inputs = np.asarray(inputs, dtype=float)
+        if inputs.shape[1] != len(self.input_nodes):
+            raise RuntimeError("Expected {0:n} inputs, got {1:n}".format(len(self.input_nodes), inputs.shape[1]))
+
+        values = {key: np.zeros(inputs.shape[0]) for key in self.output_nodes}
+        for i, key in enumerate(self.input_nodes):
+            values[key] = inputs[:, i]
+
+        for node, act_func, agg_func, bias, response, links in self.node_evals:
+            agg_name = getattr(agg_func, '__name__', None)
+            if len(links) == 0:
+                s = np.full(inputs.shape[0], float(agg_func([])))
+            elif agg_name == 'sum_aggregation':
+                s = values[links[0][0]] * links[0][1]
+                for i, w in links[1:]:
+                    s = s + values[i] * w
+            elif agg_name in BATCH_AGGREGATIONS:
+                s = BATCH_AGGREGATIONS[agg_name](np.stack([values[i] * w for i, w in links], axis=1))
+            else:
+                s = np.array([agg_func(row) for row in np.stack([values[i] * w for i, w in links], axis=1)])
+
+            z = bias + response * s
+            act_name = getattr(act_func, '__name__', None)
+            if act_name in BATCH_ACTIVATIONS:
+                values[node] = BATCH_ACTIVATIONS[act_name](z)
+            else:
+                values[node] = np.array([act_func(v) for v in z])
+
+        return np.stack([values[key] for key in self.output_nodes], axis=1)
+
     # modified argument "config" to indice "genome_config"
     @staticmethod
     def create(genome, config):
@@ -4,6 +4,8 @@ from __future__ import print_function
 from neat.math_util import mean
 from neat.reporting import ReporterSet
 
+from .checkpoint import get_indexer_value, set_indexer_value, get_random_state, set_random_state, save_checkpoint, load_checkpoint
+
 
 class CompleteExtinctionException(Exception):
     pass
@@ -55,6 +57,38 @@ class Population:
     def remove_reporter(self, reporter):
         self.reporters.remove(reporter)
 
+    def save_checkpoint(self, filename):
+        """
+        Save the state to continue evolution from the current generation (before its evaluation):
+        population, species, key indexers and random states. Reporters are not saved.
+        """
+        state = {
+            'generation': self.generation,
+            'population': self.population,
+            'best_genome': self.best_genome,
+            'species': self.species.species,
+            'genome_to_species': self.species.genome_to_species,
+            'species_indexer': get_indexer_value(self.species, 'indexer'),
+            'genome_indexer': get_indexer_value(self.reproduction, 'genome_indexer'),
+            'ancestors': self.reproduction.ancestors,
+            'node_indexer': get_indexer_value(self.config.genome_config, 'node_indexer'),
+            'random_state': get_random_state(),
+        }
+        save_checkpoint(filename, state)
+
+    def load_checkpoint(self, filename):
+        state = load_checkpoint(filename)
+        self.generation = state['generation']
+        self.population = state['population']
+        self.best_genome = state['best_genome']
+        self.species.species = state['species']
+        self.species.genome_to_species = state['genome_to_species']
+        set_indexer_value(self.species, 'indexer', state['species_indexer'])
+        set_indexer_value(self.reproduction, 'genome_indexer', state['genome_indexer'])
+        self.reproduction.ancestors = state['ancestors']
+        set_indexer_value(self.config.genome_config, 'node_indexer', state['node_indexer'])
+        set_random_state(state['random_state'])
+
     def run(self, fitness_function, constraint_function=None, n=None):
         """
         Runs NEAT's genetic algorithm for at most n generations.  If n
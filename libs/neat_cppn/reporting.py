@@ -5,10 +5,14 @@ import csv
 
 from neat.reporting import BaseReporter, ReporterSet
 
+from .checkpoint import truncate_history
+
 class SaveResultReporter(BaseReporter):
 
-    def __init__(self, save_path):
+    def __init__(self, save_path, resume=False):
         self.generation = None
+        # when resuming, history files are kept and cut back to the first generation run again
+        self.resume = resume
 
         self.save_path = save_path
         self.history_pop_file = os.path.join(self.save_path, 'history_pop.csv')
@@ -19,6 +23,9 @@ class SaveResultReporter(BaseReporter):
         self.genome_path = os.path.join(self.save_path, 'genome')
         os.makedirs(self.genome_path, exist_ok=True)
 
+        if resume:
+            return
+
         with open(self.history_pop_file, 'w') as f:
             writer = csv.DictWriter(f, fieldnames=self.history_pop_header)
             writer.writeheader()
@@ -29,6 +36,10 @@ class SaveResultReporter(BaseReporter):
 
 
     def start_generation(self, generation):
+        if self.resume:
+            truncate_history(self.history_pop_file, generation)
+            truncate_history(self.history_fitness_file, generation)
+            self.resume = False
         self.generation = generation
 
     def post_evaluate(self, config, population, species, best_genome):
@@ -63,3 +74,17 @@ class SaveResultReporter(BaseReporter):
 
     def found_solution(self, config, generation, best):
         pass
+
+
+class CheckpointReporter(BaseReporter):
+    """
+    Save a checkpoint of the population at the start of every interval-th generation.
+    """
+    def __init__(self, population, filename, interval=1):
+        self.population = population
+        self.filename = filename
+        self.interval = interval
+
+    def start_generation(self, generation):
+        if generation % self.interval == 0:
+            self.population.save_checkpoint(self.filename)
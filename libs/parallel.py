@@ -1,4 +1,5 @@
-
+import os
+import sys
 import multiprocessing.pool
 import multiprocessing as mp
 
@@ -22,23 +23,108 @@ class NonDaemonPool(mp.pool.Pool):
         proc.__class__ = NoDaemonProcess
         return proc
 
+def limit_threads(num_threads):
+    # intra-op threads of torch and BLAS libraries, environment variables are read by processes started later
+    for name in ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS']:
+        os.environ[name] = str(num_threads)
+    if 'torch' in sys.modules:
+        torch = sys.modules['torch']
+        torch.set_num_threads(num_threads)
+        try:
+            torch.set_num_interop_threads(num_threads)
+        except RuntimeError:
+            # only allowed before the first parallel work of the process
+            pass
+
+
+class WorkerResources:
+    """
+    Core budget of pool workers. Each worker gets an equal share of total_cores, limits its torch
+    and BLAS threads to the share, and is pinned to its cores when pin is set.
+    processes_per_worker (e.g. PPO env processes) is checked to fit in the budget.
+    main_processes reserves cores for work of the main process itself (e.g. its own PPO env processes),
+    applied by init_main. Env processes started through forkserver are not pinned.
+    """
+    def __init__(self, num_workers, processes_per_worker=1, total_cores=0, pin=False, main_processes=0):
+        if hasattr(os, 'sched_getaffinity'):
+            available = sorted(os.sched_getaffinity(0))
+        else:
+            available = list(range(os.cpu_count()))
+        if total_cores <= 0:
+            total_cores = len(available)
+        assert total_cores <= len(available), \
+            f'core budget {total_cores} exceeds {len(available)} available cores'
+        assert main_processes + num_workers * processes_per_worker <= total_cores, \
+            f'{main_processes} main processes and {num_workers} workers x {processes_per_worker} processes exceed the core budget {total_cores}'
+
+        self.num_workers = num_workers
+        self.total_cores = total_cores
+        self.main_allocation = available[:main_processes]
+        worker_cores = available[main_processes:total_cores]
+        self.threads = max(1, len(worker_cores) // num_workers)
+        self.allocation = [worker_cores[i*self.threads:(i+1)*self.threads] for i in range(num_workers)]
+        self.pin = pin and hasattr(os, 'sched_setaffinity')
+        self.counter = mp.Value('i', 0)
+
+    def __str__(self):
+        pin = 'pinned' if self.pin else 'not pinned'
+        main = f'main {len(self.main_allocation)} threads + ' if len(self.main_allocation) > 0 else ''
+        return f'{main}{self.num_workers} workers x {self.threads} threads on {self.total_cores} cores ({pin})'
+
+    def init_main(self):
+        # called in the main process, before it starts the pool and its own env processes
+        if len(self.main_allocation) == 0:
+            return
+        limit_threads(len(self.main_allocation))
+        if self.pin:
+            os.sched_setaffinity(0, self.main_allocation)
+
+    def init_worker(self):
+        with self.counter.get_lock():
+            slot = self.counter.value % self.num_workers
+            self.counter.value += 1
+
+        limit_threads(self.threads)
+        if self.pin:
+            os.sched_setaffinity(0, self.allocation[slot])
+
+    def make_pool(self):
+        return NonDaemonPool(self.num_workers, initializer=self.init_worker)
+
+
 class EvaluatorParallel:
-    def __init__(self, num_workers, decode_function, evaluate_function, revaluate=False, timeout=None, parallel=True, print_progress=True):
+    def __init__(self, num_workers, decode_function, evaluate_function, revaluate=False, timeout=None, parallel=True, print_progress=True, chunk_size=1, resources=None):
         self.num_workers = num_workers
         self.decode_function = decode_function
         self.evaluate_function = evaluate_function
         self.revaluate = revaluate
         self.timeout = timeout
         self.parallel = parallel
-        self.pool = NonDaemonPool(num_workers) if parallel and num_workers>0 else None
+        if not parallel or num_workers <= 0:
+            self.pool = None
+        elif resources is not None:
+            # thread limits and core pinning of workers, see WorkerResources
+            self.pool = resources.make_pool()
+        else:
+            self.pool = NonDaemonPool(num_workers)
         self.print_progress = print_progress
+        # chunk_size > 1: evaluate_function takes lists (keys, phenomes, generation) of up to
+        # chunk_size genomes and returns a list of results in the same order
+        self.chunk_size = chunk_size
 
     def __del__(self):
         if self.pool is not None:
             self.pool.close()
             self.pool.join()
 
-    def evaluate(self, genomes, config, generation):
+    def evaluate(self, genomes, config, generation, evaluate_function=None):
+        # evaluate_function replaces the one of the evaluator for this call (e.g. a second scoring on the same pool)
+        if evaluate_function is None:
+            evaluate_function = self.evaluate_function
+
+        if self.chunk_size > 1:
+            self.evaluate_chunks(genomes, config, generation, evaluate_function)
+            return
 
         size = len(genomes)
 
@@ -52,7 +138,7 @@ class EvaluatorParallel:
                     continue
 
                 args = (key, phenome, generation)
-                jobs[key] = self.pool.apply_async(self.evaluate_function, args=args)
+                jobs[key] = self.pool.apply_async(evaluate_function, args=args)
 
             # assign the result back to each genome
             for i,(key,genome) in enumerate(genomes.items()):
@@ -73,7 +159,7 @@ class EvaluatorParallel:
                 phenome = self.decode_function(genome, config.genome_config)
 
                 args = (key, phenome, generation)
-                results = self.evaluate_function(*args)
+                results = evaluate_function(*args)
                 for attr, data in results.items():
                     setattr(genome, attr, data)
                 if self.print_progress:
@@ -81,84 +167,255 @@ class EvaluatorParallel:
             if self.print_progress:
                 print('evaluating genomes ... done')
 
+    def evaluate_chunks(self, genomes, config, generation, evaluate_function):
+
+        keys = [key for key,genome in genomes.items()
+                if self.revaluate or getattr(genome, 'fitness', None) is None]
+        chunks = [keys[i:i+self.chunk_size] for i in range(0, len(keys), self.chunk_size)]
+
+        jobs = []
+        for chunk in chunks:
+            phenomes = [self.decode_function(genomes[key], config.genome_config) for key in chunk]
+            args = (chunk, phenomes, generation)
+            if self.parallel:
+                jobs.append(self.pool.apply_async(evaluate_function, args=args))
+            else:
+                jobs.append(evaluate_function(*args))
+
+        done = 0
+        for chunk, job in zip(chunks, jobs):
+            results_list = job.get(timeout=self.timeout) if self.parallel else job
+            for key, results in zip(chunk, results_list):
+                for attr, data in results.items():
+                    setattr(genomes[key], attr, data)
+
+            done += len(chunk)
+            if self.print_progress:
+                print(f'\revaluating genomes ... {done: =4}/{len(keys): =4}', end='')
+        if self.print_progress:
+            print('evaluating genomes ... done')
+
+
+# success counters of MCC genomes, shared with pool workers at process start.
+# counters are plain ints in shared memory, updated under a single lock so that
+# checking the limits and counting up a pair is atomic.
+_mcc_counts1 = None
+_mcc_counts2 = None
+_mcc_lock = None
+
+def _init_mcc_worker(counts1, counts2, lock):
+    global _mcc_counts1, _mcc_counts2, _mcc_lock
+    _mcc_counts1 = counts1
+    _mcc_counts2 = counts2
+    _mcc_lock = lock
+
+
 class MCCEvaluatorParallel:
-    def __init__(self, num_workers, evaluate_function, decode_function1, decode_function2, timeout=None):
+    def __init__(self, num_workers, evaluate_function, decode_function1, decode_function2, timeout=None,
+                 outcome_matrix=None, identify_function1=None, identify_function2=None):
+        # evaluate_function(phenome1, phenome2, generation) returns (success, steps)
         self.num_workers = num_workers
         self.evaluate_function = evaluate_function
         self.decode_function1 = decode_function1
         self.decode_function2 = decode_function2
         self.timeout = timeout
 
-        self.pool = NonDaemonPool(num_workers)
-        self.manager = mp.Manager()
+        # outcomes of already evaluated pairs, only for deterministic evaluate_function.
+        # pairs are looked up by identify_function(genome) (default: genome key)
+        self.outcome_matrix = outcome_matrix
+        self.identify_function1 = identify_function1
+        self.identify_function2 = identify_function2
+
+        self.pool = None
+        self.counts1 = None
+        self.counts2 = None
+        self.lock = None
+
+        # genomes never change once they are in the population, so keep their phenomes
+        self.phenome1_cache = {}
+        self.phenome2_cache = {}
 
     def __del__(self):
-        self.pool.close()
-        self.pool.join()
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def prepare_counts(self, size1, size2):
+        # workers get the shared arrays when they are spawned, so grow them by restarting the pool
+        if self.pool is not None and len(self.counts1) >= size1 and len(self.counts2) >= size2:
+            return
+
+        self.close()
+        self.counts1 = mp.RawArray('i', max(size1, 1))
+        self.counts2 = mp.RawArray('i', max(size2, 1))
+        self.lock = mp.Lock()
+        _init_mcc_worker(self.counts1, self.counts2, self.lock)
+        self.pool = NonDaemonPool(self.num_workers, initializer=_init_mcc_worker,
+                                  initargs=(self.counts1, self.counts2, self.lock))
 
     def evaluate(self, offsprings1_genome, offsprings2_genome, population1_genome, population2_genome, config, generation):
 
         offsprings1_phenome = {key1: self.decode_function1(genome1, config.genome1_config) for key1,genome1 in offsprings1_genome.items()}
         offsprings2_phenome = {key2: self.decode_function2(genome2, config.genome2_config) for key2,genome2 in offsprings2_genome.items()}
 
-        population1_phenome = {key1: self.decode_function1(genome1, config.genome1_config) for key1,genome1 in population1_genome.items()}
-        population2_phenome = {key2: self.decode_function2(genome2, config.genome2_config) for key2,genome2 in population2_genome.items()}
+        population1_phenome = self.get_population_phenomes(self.phenome1_cache, population1_genome, self.decode_function1, config.genome1_config)
+        population2_phenome = self.get_population_phenomes(self.phenome2_cache, population2_genome, self.decode_function2, config.genome2_config)
+
+        self.prepare_counts(len(offsprings1_genome)+len(population1_genome),
+                            len(offsprings2_genome)+len(population2_genome))
 
-        offsprings1_count = {key1: self.manager.Value('i', 0) for key1 in offsprings1_genome.keys()}
-        offsprings2_count = {key2: self.manager.Value('i', 0) for key2 in offsprings2_genome.keys()}
+        # index of each genome in the shared counters
+        slots1 = {key1: i for i,key1 in enumerate(list(offsprings1_genome.keys())+list(population1_genome.keys()))}
+        slots2 = {key2: i for i,key2 in enumerate(list(offsprings2_genome.keys())+list(population2_genome.keys()))}
+        for key1,slot1 in slots1.items():
+            genome1 = offsprings1_genome[key1] if key1 in offsprings1_genome else population1_genome[key1]
+            self.counts1[slot1] = len(genome1.success_keys)
+        for key2,slot2 in slots2.items():
+            genome2 = offsprings2_genome[key2] if key2 in offsprings2_genome else population2_genome[key2]
+            self.counts2[slot2] = len(genome2.success_keys)
 
-        population1_count = {key1: self.manager.Value('i', len(genome1.success_keys)) for key1,genome1 in population1_genome.items()}
-        population2_count = {key2: self.manager.Value('i', len(genome2.success_keys)) for key2,genome2 in population2_genome.items()}
 
+        ids1 = self.get_ids(self.identify_function1, offsprings1_genome, population1_genome)
+        ids2 = self.get_ids(self.identify_function2, offsprings2_genome, population2_genome)
 
-        # evaluate genome1
-        self.evalute_one_side(offsprings1_genome, offsprings1_phenome, offsprings1_count,
-                              population2_genome, population2_phenome, population2_count, config, generation)
-        # evaluate genome2
-        self.evalute_one_side(population1_genome, population1_phenome, population1_count,
-                              offsprings2_genome, offsprings2_phenome, offsprings2_count, config, generation)
+        # both sides touch disjoint counters (offsprings1 with population2, population1 with offsprings2),
+        # so all chunks are submitted at once
+        jobs1 = self.submit_one_side(offsprings1_phenome, slots1, ids1, population2_phenome, slots2, ids2, 1, config, generation)
+        jobs2 = self.submit_one_side(offsprings2_phenome, slots2, ids2, population1_phenome, slots1, ids1, 2, config, generation)
+
+        self.collect_one_side(jobs1, offsprings1_genome, ids1, population2_genome, ids2, 1)
+        self.collect_one_side(jobs2, offsprings2_genome, ids2, population1_genome, ids1, 2)
 
         for key1 in offsprings1_genome.keys():
-            offsprings1_genome[key1].fitness = offsprings1_count[key1].value
+            offsprings1_genome[key1].fitness = self.counts1[slots1[key1]]
         for key2 in offsprings2_genome.keys():
-            offsprings2_genome[key2].fitness = offsprings2_count[key2].value
+            offsprings2_genome[key2].fitness = self.counts2[slots2[key2]]
 
-    def evalute_one_side(self, genomes1, phenomes1, counts1, genomes2, phenomes2, counts2, config, generation):
-        jobs = {}
-        for key1 in genomes1.keys():
-            for key2 in genomes2.keys():
-                args = (phenomes1[key1], counts1[key1],
-                        phenomes2[key2], counts2[key2],
-                        config, generation, self.evaluate_function)
-                jobs[(key1, key2)] = self.pool.apply_async(self.conditioned_evaluation, args=args)
+        # offsprings may survive into the next population
+        self.phenome1_cache.update(offsprings1_phenome)
+        self.phenome2_cache.update(offsprings2_phenome)
 
-        for key1, genome1 in genomes1.items():
-            for key2, genome2 in genomes2.items():
-                success = jobs[(key1, key2)].get(timeout=self.timeout)
+    @staticmethod
+    def get_population_phenomes(cache, population_genome, decode_function, genome_config):
+        # evict genomes dropped from the population by update_pop, decode only new comers
+        for key in list(cache.keys()):
+            if key not in population_genome:
+                del cache[key]
+
+        for key,genome in population_genome.items():
+            if key not in cache:
+                cache[key] = decode_function(genome, genome_config)
 
-                if success:
-                    genome1.success_keys.append(key2)
-                    genome2.success_keys.append(key1)
+        return {key: cache[key] for key in population_genome.keys()}
 
     @staticmethod
-    def conditioned_evaluation(phenome1, achieve1, phenome2, achieve2, config, generation, evaluate_function):
-        count_up = False
+    def get_ids(identify_function, offsprings_genome, population_genome):
+        genomes = list(offsprings_genome.items()) + list(population_genome.items())
+        if identify_function is None:
+            return {key: key for key,_ in genomes}
+        return {key: identify_function(genome) for key,genome in genomes}
+
+    def get_known_outcome(self, id_, opponent_id, side):
+        if self.outcome_matrix is None:
+            return None
+        if side == 1:
+            return self.outcome_matrix.get(id_, opponent_id)
+        else:
+            return self.outcome_matrix.get(opponent_id, id_)
 
-        if (config.genome1_limit > 0 and achieve1.value >= config.genome1_limit) or\
-           (config.genome2_limit > 0 and achieve2.value >= config.genome2_limit):
-            return count_up
-        if achieve1.value >= config.genome1_criterion and achieve2.value >= config.genome2_criterion:
-            return count_up
+    def submit_one_side(self, offsprings_phenome, offsprings_slots, offsprings_ids,
+                        opponents_phenome, opponents_slots, opponents_ids, side, config, generation):
+        # one chunk per offspring: the offspring is shipped once and tries the opponents in order.
+        # phenomes of pairs with a known outcome are not shipped.
+        jobs = {}
+        for key,phenome in offsprings_phenome.items():
+            opponents = []
+            for opponent_key,opponent_phenome in opponents_phenome.items():
+                known = self.get_known_outcome(offsprings_ids[key], opponents_ids[opponent_key], side)
+                opponents.append((opponent_key, opponents_slots[opponent_key],
+                                  opponent_phenome if known is None else None, known))
+
+            args = (phenome, offsprings_slots[key], opponents, side,
+                    config, generation, self.evaluate_function)
+            jobs[key] = self.pool.apply_async(self.chunk_evaluation, args=args)
+        return jobs
+
+    def collect_one_side(self, jobs, offsprings_genome, offsprings_ids, opponents_genome, opponents_ids, side):
+        for key, genome in offsprings_genome.items():
+            success_keys, outcomes = jobs[key].get(timeout=self.timeout)
+
+            for opponent_key in success_keys:
+                genome.success_keys.append(opponent_key)
+                opponents_genome[opponent_key].success_keys.append(key)
+
+            if self.outcome_matrix is None:
+                continue
+            for opponent_key, success, steps in outcomes:
+                if side == 1:
+                    self.outcome_matrix.set(offsprings_ids[key], opponents_ids[opponent_key], success, steps)
+                else:
+                    self.outcome_matrix.set(opponents_ids[opponent_key], offsprings_ids[key], success, steps)
 
-        success = evaluate_function(phenome1, phenome2, generation)
+    @staticmethod
+    def chunk_evaluation(phenome, slot, opponents, side, config, generation, evaluate_function):
+        success_keys = []
+        outcomes = []
+        for opponent_key, opponent_slot, opponent_phenome, known in opponents:
+            if side == 1:
+                slot1, phenome1, slot2, phenome2 = slot, phenome, opponent_slot, opponent_phenome
+            else:
+                slot1, phenome1, slot2, phenome2 = opponent_slot, opponent_phenome, slot, phenome
+
+            # once the offspring reached its limit, no remaining pair can change the outcome
+            limit = config.genome1_limit if side == 1 else config.genome2_limit
+            achieve = _mcc_counts1[slot1] if side == 1 else _mcc_counts2[slot2]
+            if limit > 0 and achieve >= limit:
+                break
+
+            count_up, outcome = MCCEvaluatorParallel.conditioned_evaluation(
+                phenome1, slot1, phenome2, slot2, config, generation, evaluate_function, known=known)
+            if count_up:
+                success_keys.append(opponent_key)
+            if outcome is not None and known is None:
+                outcomes.append((opponent_key, *outcome))
+        return success_keys, outcomes
 
-        if success:
-            if (achieve1.value < config.genome1_criterion and (config.genome2_limit == 0 or achieve2.value < config.genome2_limit)) or \
-               (achieve2.value < config.genome2_criterion and (config.genome1_limit == 0 or achieve1.value < config.genome1_limit)):
+    @staticmethod
+    def is_settled(achieve1, achieve2, config):
+        if (config.genome1_limit > 0 and achieve1 >= config.genome1_limit) or\
+           (config.genome2_limit > 0 and achieve2 >= config.genome2_limit):
+            return True
+        return achieve1 >= config.genome1_criterion and achieve2 >= config.genome2_criterion
 
-               achieve1.value += 1
-               achieve2.value += 1
+    @staticmethod
+    def is_countable(achieve1, achieve2, config):
+        return (achieve1 < config.genome1_criterion and (config.genome2_limit == 0 or achieve2 < config.genome2_limit)) or \
+               (achieve2 < config.genome2_criterion and (config.genome1_limit == 0 or achieve1 < config.genome1_limit))
 
-               count_up = True
+    @staticmethod
+    def conditioned_evaluation(phenome1, slot1, phenome2, slot2, config, generation, evaluate_function, known=None):
+        # lock-free read, only used to skip pairs whose result can not be counted anymore
+        if MCCEvaluatorParallel.is_settled(_mcc_counts1[slot1], _mcc_counts2[slot2], config):
+            return False, None
 
-        return count_up
+        if known is None:
+            outcome = evaluate_function(phenome1, phenome2, generation)
+        else:
+            outcome = known
+        if not outcome[0]:
+            return False, outcome
+
+        # check and count up atomically, so that the limits are never exceeded
+        with _mcc_lock:
+            achieve1, achieve2 = _mcc_counts1[slot1], _mcc_counts2[slot2]
+            if MCCEvaluatorParallel.is_settled(achieve1, achieve2, config) or \
+               not MCCEvaluatorParallel.is_countable(achieve1, achieve2, config):
+                return False, outcome
+            _mcc_counts1[slot1] += 1
+            _mcc_counts2[slot2] += 1
+
+        return True, outcome
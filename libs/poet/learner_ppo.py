@@ -9,6 +9,7 @@ import torch
 from gym_utils import make_vec_envs
 
 from ppo import PPO, Policy
+from numpy_policy import NumpyPolicy
 
 
 def dummy():
@@ -58,18 +59,15 @@ def transfer_step(env_kwargs, config, params, obs_rms):
 
 
 def evaluate(env_kwargs, params, obs_rms):
-    envs = make_vec_envs(**env_kwargs)
-    envs.training = False
-    envs.obs_rms = obs_rms
+    # observations are normalized by the policy, not by VecNormalize
+    envs = make_vec_envs(**dict(env_kwargs, vecnormalize=False))
 
-    policy = Policy(envs.observation_space, envs.action_space, device='cpu')
-    policy.load_state_dict(params)
+    policy = NumpyPolicy.from_state_dict(params, obs_rms)
 
     obs = envs.reset()
     done = False
     while not done:
-        with torch.no_grad():
-            action = policy.predict(obs, deterministic=True)
+        action = policy.predict(obs, deterministic=True)
         obs, _, done, infos = envs.step(action)
 
         if 'episode' in infos[0]:
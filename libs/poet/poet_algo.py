@@ -53,7 +53,8 @@ class POET:
                  novelty_knn=1,
                  novelty_threshold=0.1,
                  reset_optimizer=True,
-                 reset_pool=False):
+                 reset_pool=False,
+                 resources=None):
 
         self.env_config = environment_config
         self.opt_config = optimizer_config
@@ -86,10 +87,14 @@ class POET:
 
         self.reset_pool = reset_pool
         self.num_workers = num_workers
+        # thread limits and core pinning of the main process, which trains the niches, and of workers (parallel.WorkerResources)
+        self.resources = resources
+        if self.resources is not None:
+            self.resources.init_main()
         if self.reset_pool:
             self.pool = None
         else:
-            self.pool = NonDaemonPool(self.num_workers)
+            self.pool = self.make_pool()
 
         self.save_path = save_path
         self.niche_path = os.path.join(save_path, 'niche')
@@ -101,6 +106,11 @@ class POET:
             writer = csv.DictWriter(f, fieldnames=self.history_header)
             writer.writeheader()
     
+    def make_pool(self):
+        if self.resources is None:
+            return NonDaemonPool(self.num_workers)
+        return NonDaemonPool(self.num_workers, initializer=self.resources.init_worker)
+
     def get_new_niche_key(self):
         return next(self.niche_indexer)
 
@@ -328,7 +338,7 @@ class POET:
         print()
 
         if self.reset_pool:
-            self.pool = NonDaemonPool(self.num_workers)
+            self.pool = self.make_pool()
 
     def end_iteration(self):
         save_core = self.save_core_interval > 0 and (self.iteration+1) % self.save_core_interval == 0
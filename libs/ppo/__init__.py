@@ -1,2 +1,3 @@
 from .ppo import PPO
-from .policy import Policy
\ No newline at end of file
+from .policy import Policy
+from .multi import MultiPolicy, MultiPPO
@@ -0,0 +1,326 @@
+import numpy as np
+import torch
+from torch import nn
+
+from .rollout import compute_gae
+
+
+class StackedLinear(nn.Module):
+    """
+    K independent linear layers applied with one batched matmul: (K, batch, in) -> (K, batch, out).
+    in_features and out_features of each policy may be smaller than the stacked size,
+    the padding weights are zero.
+    """
+    def __init__(self, in_features, out_features, gain=1.0):
+        super().__init__()
+        num_policies = len(in_features)
+        in_max, out_max = max(in_features), max(out_features)
+
+        self.weight = nn.Parameter(torch.zeros(num_policies, out_max, in_max))
+        self.bias = nn.Parameter(torch.zeros(num_policies, out_max))
+        for k, (in_k, out_k) in enumerate(zip(in_features, out_features)):
+            weight = torch.empty(out_k, in_k)
+            nn.init.orthogonal_(weight, gain=gain)
+            self.weight.data[k, :out_k, :in_k] = weight
+
+    def forward(self, x):
+        return torch.baddbmm(self.bias.unsqueeze(1), x, self.weight.transpose(1, 2))
+
+
+class MultiPolicy(nn.Module):
+    """
+    K independent Policy networks (64x64 tanh actor and critic, diagonal gaussian actions)
+    held as stacked parameters, so every forward pass runs all of them at once.
+    Observations and actions are zero padded to the largest robot; padded action dimensions
+    are excluded from log probabilities and entropies.
+    """
+    def __init__(self, obs_dims, act_dims, init_log_std=0.0, hidden_size=64):
+        super().__init__()
+        self.obs_dims = list(obs_dims)
+        self.act_dims = list(act_dims)
+        self.num_policies = len(obs_dims)
+        self.obs_size = max(obs_dims)
+        self.act_size = max(act_dims)
+
+        K = self.num_policies
+        hidden = [hidden_size] * K
+        gain = np.sqrt(2)
+        self.pi1 = StackedLinear(self.obs_dims, hidden, gain=gain)
+        self.pi2 = StackedLinear(hidden, hidden, gain=gain)
+        self.vf1 = StackedLinear(self.obs_dims, hidden, gain=gain)
+        self.vf2 = StackedLinear(hidden, hidden, gain=gain)
+        self.action_net = StackedLinear(hidden, self.act_dims, gain=0.01)
+        self.value_net = StackedLinear(hidden, [1] * K, gain=1)
+        self.log_std = nn.Parameter(torch.full((K, self.act_size), float(init_log_std)))
+
+        act_mask = torch.zeros(K, self.act_size)
+        for k, act_k in enumerate(self.act_dims):
+            act_mask[k, :act_k] = 1
+        self.register_buffer('act_mask', act_mask)
+
+    def forward(self, obs):
+        # obs: (K, batch, obs_size) -> mean actions (K, batch, act_size), values (K, batch)
+        latent_pi = torch.tanh(self.pi2(torch.tanh(self.pi1(obs))))
+        latent_vf = torch.tanh(self.vf2(torch.tanh(self.vf1(obs))))
+        return self.action_net(latent_pi), self.value_net(latent_vf).squeeze(-1)
+
+    def predict_values(self, obs):
+        latent_vf = torch.tanh(self.vf2(torch.tanh(self.vf1(obs))))
+        return self.value_net(latent_vf).squeeze(-1)
+
+    def sample(self, mean_actions, deterministic=False):
+        if deterministic:
+            return mean_actions
+        std = torch.exp(self.log_std).unsqueeze(1)
+        return (mean_actions + std * torch.randn_like(mean_actions)) * self.act_mask.unsqueeze(1)
+
+    def log_prob(self, actions, mean_actions):
+        log_std = self.log_std.unsqueeze(1)
+        log_prob = -((actions - mean_actions) ** 2) / (2 * torch.exp(2 * log_std)) - log_std - 0.5 * np.log(2 * np.pi)
+        return torch.sum(log_prob * self.act_mask.unsqueeze(1), dim=-1)
+
+    def entropy(self):
+        entropy = 0.5 + 0.5 * np.log(2 * np.pi) + self.log_std
+        return torch.sum(entropy * self.act_mask, dim=-1)
+
+    def get_policy_state_dict(self, k):
+        """
+        Parameters of policy k in the state_dict layout of ppo.Policy, without padding.
+        """
+        obs_k, act_k = self.obs_dims[k], self.act_dims[k]
+        state = {
+            'log_std': self.log_std[k, :act_k],
+            'mlp_extractor.policy_net.0.weight': self.pi1.weight[k, :, :obs_k],
+            'mlp_extractor.policy_net.0.bias': self.pi1.bias[k],
+            'mlp_extractor.policy_net.2.weight': self.pi2.weight[k],
+            'mlp_extractor.policy_net.2.bias': self.pi2.bias[k],
+            'mlp_extractor.value_net.0.weight': self.vf1.weight[k, :, :obs_k],
+            'mlp_extractor.value_net.0.bias': self.vf1.bias[k],
+            'mlp_extractor.value_net.2.weight': self.vf2.weight[k],
+            'mlp_extractor.value_net.2.bias': self.vf2.bias[k],
+            'action_net.weight': self.action_net.weight[k, :act_k],
+            'action_net.bias': self.action_net.bias[k, :act_k],
+            'value_net.weight': self.value_net.weight[k, :1],
+            'value_net.bias': self.value_net.bias[k, :1],
+        }
+        return {name: value.detach().clone() for name, value in state.items()}
+
+
+class MultiPPO:
+    """
+    PPO for K policies of a MultiPolicy, each with its own vec env of E environments.
+    Rollouts of all K x E environments are collected together, and each minibatch update
+    runs all K policies in one forward/backward pass. Losses, advantage normalization and
+    gradient clipping are per policy, and Adam is elementwise, so every policy is trained
+    as with its own PPO. A policy removed by stop(k) is no longer stepped nor updated.
+    """
+    def __init__(self,
+        policy,
+        envs,
+        learning_rate=3e-4,
+        n_steps=128,
+        batch_size=128,
+        n_epochs=8,
+        gamma=0.99,
+        gae_lambda=0.95,
+        clip_range=0.2,
+        clip_range_vf=None,
+        normalize_advantage=True,
+        ent_coef=0.0,
+        vf_coef=0.5,
+        max_grad_norm=0.5,
+        lr_decay=True,
+        max_iter=None):
+
+        assert len(envs) == policy.num_policies
+        assert all(env.num_envs == envs[0].num_envs for env in envs), 'every policy needs the same number of envs'
+
+        self.policy = policy
+        self.envs = envs
+        self.num_envs = envs[0].num_envs
+        self.n_steps = n_steps
+        self.batch_size = batch_size
+        self.n_epochs = n_epochs
+        self.gamma = gamma
+        self.gae_lambda = gae_lambda
+        self.clip_range = clip_range
+        self.clip_range_vf = clip_range_vf
+        self.normalize_advantage = normalize_advantage
+        self.ent_coef = ent_coef
+        self.vf_coef = vf_coef
+        self.max_grad_norm = max_grad_norm
+        self.lr_decay = lr_decay
+        self.max_iter = max_iter
+        self.initial_lr = learning_rate
+
+        K, E = policy.num_policies, self.num_envs
+        self.observations = torch.zeros(n_steps, K, E, policy.obs_size)
+        self.actions = torch.zeros(n_steps, K, E, policy.act_size)
+        self.rewards = torch.zeros(n_steps, K, E)
+        self.episode_starts = torch.zeros(n_steps, K, E)
+        self.values = torch.zeros(n_steps, K, E)
+        self.log_probs = torch.zeros(n_steps, K, E)
+        self.advantages = torch.zeros(n_steps, K, E)
+        self.returns = torch.zeros(n_steps, K, E)
+
+        self._last_obs = self.pad_obs([env.reset() for env in envs])
+        self._last_episode_starts = torch.ones(K, E)
+        # 1 for policies still trained, 0 for stopped ones
+        self.active = torch.ones(K)
+
+        self.iter = 0
+
+        self.optimizer = torch.optim.Adam(policy.parameters(), lr=learning_rate, eps=1e-5)
+
+    def pad_obs(self, obs_list):
+        obs = torch.zeros(self.policy.num_policies, self.num_envs, self.policy.obs_size)
+        for k, obs_k in enumerate(obs_list):
+            obs[k, :, :obs_k.shape[-1]] = torch.as_tensor(obs_k, dtype=torch.float32)
+        return obs
+
+    def update_lr(self):
+        lr = self.initial_lr * (1 - (self.iter / self.max_iter))
+        for param_group in self.optimizer.param_groups:
+            param_group['lr'] = lr
+
+    def stop(self, k):
+        # stopped policies get zero gradients, and with the first moment of Adam cleared their parameters stay fixed
+        self.active[k] = 0
+        for p in self.policy.parameters():
+            state = self.optimizer.state.get(p, {})
+            if 'exp_avg' in state:
+                state['exp_avg'][k] = 0
+
+    def clip_grad_norm(self):
+        # gradient norm of each policy separately, all parameters have the policy axis first
+        params = [p for p in self.policy.parameters() if p.grad is not None]
+        norms = torch.zeros(self.policy.num_policies)
+        for p in params:
+            norms += p.grad.reshape(self.policy.num_policies, -1).pow(2).sum(dim=1)
+        coef = torch.clamp(self.max_grad_norm / (norms.sqrt() + 1e-6), max=1.0)
+        for p in params:
+            p.grad.mul_(coef.view(-1, *([1] * (p.grad.dim() - 1))))
+
+    def collect_rollouts(self):
+        K = self.policy.num_policies
+        for step in range(self.n_steps):
+            with torch.no_grad():
+                mean_actions, values = self.policy(self._last_obs)
+                actions = self.policy.sample(mean_actions)
+                log_probs = self.policy.log_prob(actions, mean_actions)
+            actions_np = actions.numpy()
+
+            # step the vec envs of active policies at once, then gather
+            active = [k for k in range(K) if self.active[k] > 0]
+            for k in active:
+                self.envs[k].step_async(actions_np[k, :, :self.policy.act_dims[k]])
+            results = {k: self.envs[k].step_wait() for k in active}
+
+            rewards = torch.zeros(K, self.num_envs)
+            dones = torch.zeros(K, self.num_envs)
+            truncated = []
+            for k, (_, rewards_k, dones_k, infos_k) in results.items():
+                rewards[k] = torch.as_tensor(rewards_k, dtype=torch.float32)
+                dones[k] = torch.as_tensor(dones_k, dtype=torch.float32)
+                for idx, done in enumerate(dones_k):
+                    if (
+                        done
+                        and infos_k[idx].get("terminal_observation") is not None
+                        and infos_k[idx].get("TimeLimit.truncated", False)
+                        ):
+                        truncated.append((k, idx, infos_k[idx]["terminal_observation"]))
+
+            if len(truncated) > 0:
+                # bootstrap every truncated episode with one value pass
+                terminal_obs = torch.zeros(K, self.num_envs, self.policy.obs_size)
+                for k, idx, obs in truncated:
+                    terminal_obs[k, idx, :self.policy.obs_dims[k]] = torch.as_tensor(np.ravel(obs), dtype=torch.float32)
+                with torch.no_grad():
+                    terminal_values = self.policy.predict_values(terminal_obs)
+                for k, idx, _ in truncated:
+                    rewards[k, idx] += self.gamma * terminal_values[k, idx]
+
+            self.observations[step] = self._last_obs
+            self.actions[step] = actions
+            self.rewards[step] = rewards
+            self.episode_starts[step] = self._last_episode_starts
+            self.values[step] = values
+            self.log_probs[step] = log_probs
+
+            # stopped policies keep their last observations, their steps are masked out of the update
+            next_obs = self._last_obs.clone()
+            for k, (obs_k, *_) in results.items():
+                next_obs[k, :, :obs_k.shape[-1]] = torch.as_tensor(obs_k, dtype=torch.float32)
+            self._last_obs = next_obs
+            self._last_episode_starts = dones
+
+        with torch.no_grad():
+            last_values = self.policy.predict_values(self._last_obs)
+        self.compute_returns_and_advantage(last_values, self._last_episode_starts)
+
+    def compute_returns_and_advantage(self, last_values, dones):
+        _, returns = compute_gae(
+            self.rewards.numpy(), self.values.numpy(), self.episode_starts.numpy(),
+            last_values.numpy(), dones.numpy(),
+            self.gamma, self.gae_lambda, advantages=self.advantages.numpy())
+        self.returns = torch.from_numpy(returns)
+
+    def train(self):
+        if self.lr_decay:
+            self.update_lr()
+
+        K = self.policy.num_policies
+        size = self.n_steps * self.num_envs
+
+        def flatten(tensor):
+            # (n_steps, K, E, ...) -> (K, n_steps*E, ...)
+            return tensor.transpose(0, 1).reshape(K, size, *tensor.shape[3:])
+
+        observations = flatten(self.observations)
+        actions = flatten(self.actions)
+        old_values = flatten(self.values)
+        old_log_probs = flatten(self.log_probs)
+        advantages_all = flatten(self.advantages)
+        returns_all = flatten(self.returns)
+
+        for epoch in range(self.n_epochs):
+            indices = torch.randperm(size)
+            for start in range(0, size, self.batch_size):
+                batch = indices[start:start + self.batch_size]
+
+                mean_actions, values = self.policy(observations[:, batch])
+                log_prob = self.policy.log_prob(actions[:, batch], mean_actions)
+                entropy = self.policy.entropy()
+
+                advantages = advantages_all[:, batch]
+                if self.normalize_advantage and len(batch) > 1:
+                    advantages = (advantages - advantages.mean(dim=1, keepdim=True)) / (advantages.std(dim=1, keepdim=True) + 1e-8)
+
+                ratio = torch.exp(log_prob - old_log_probs[:, batch])
+
+                policy_loss_1 = advantages * ratio
+                policy_loss_2 = advantages * torch.clamp(ratio, 1 - self.clip_range, 1 + self.clip_range)
+                policy_loss = -torch.min(policy_loss_1, policy_loss_2).mean(dim=1)
+
+                if self.clip_range_vf is None:
+                    values_pred = values
+                else:
+                    values_pred = old_values[:, batch] + torch.clamp(
+                        values - old_values[:, batch], -self.clip_range_vf, self.clip_range_vf
+                    )
+                value_loss = torch.mean((returns_all[:, batch] - values_pred) ** 2, dim=1)
+
+                entropy_loss = -entropy
+
+                # policies share no parameters, so the sum gives each its own gradient
+                loss = torch.sum((policy_loss + self.ent_coef * entropy_loss + self.vf_coef * value_loss) * self.active)
+
+                self.optimizer.zero_grad()
+                loss.backward()
+                self.clip_grad_norm()
+                self.optimizer.step()
+
+    def step(self):
+        self.collect_rollouts()
+        self.train()
+        self.iter += 1
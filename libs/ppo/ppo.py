@@ -2,8 +2,7 @@
 import numpy as np
 import torch
 from torch.nn import functional as F
-# from .rollout import Rollout
-from stable_baselines3.common.buffers import RolloutBuffer
+from .rollout import Rollout
 
 def update_linear_schedule(optimizer, epoch, total_num_epochs, initial_lr):
     lr = initial_lr - (initial_lr * (epoch / float(total_num_epochs)))
@@ -30,14 +29,13 @@ class PPO:
         lr_decay=True,
         max_iter=None):
 
-        self.rollout_buffer = RolloutBuffer(
+        self.rollout_buffer = Rollout(
             n_steps,
-            env.observation_space,
-            env.action_space,
-            device=device,
+            env.observation_space.shape,
+            env.action_space.shape,
+            env.num_envs,
             gamma=gamma,
             gae_lambda=gae_lambda,
-            n_envs=env.num_envs,
         )
         self.policy = policy
         self.env = env
@@ -123,17 +121,20 @@ class PPO:
 
             n_steps += 1
 
-            for idx, done in enumerate(dones):
+            truncated = [
+                idx for idx, done in enumerate(dones)
                 if (
                     done
                     and infos[idx].get("terminal_observation") is not None
                     and infos[idx].get("TimeLimit.truncated", False)
-                    ):
-                    terminal_obs = np.array(infos[idx]["terminal_observation"])
-                    terminal_obs = terminal_obs.reshape((-1,) + self.observation_space.shape)
-                    with torch.no_grad():
-                        terminal_value = self.policy.predict_values(terminal_obs)[0]
-                    rewards[idx] += self.gamma * terminal_value
+                    )
+            ]
+            if len(truncated) > 0:
+                # bootstrap every truncated episode with one value pass
+                terminal_obs = np.stack([np.array(infos[idx]["terminal_observation"]).reshape(self.observation_space.shape) for idx in truncated])
+                with torch.no_grad():
+                    terminal_values = self.policy.predict_values(terminal_obs).flatten().cpu().numpy()
+                rewards[truncated] += self.gamma * terminal_values
 
             self.rollout_buffer.add(self._last_obs, actions, rewards, self._last_episode_starts, values, log_probs)
             self._last_obs = new_obs
@@ -0,0 +1,96 @@
+from collections import namedtuple
+
+import numpy as np
+import torch
+
+
+RolloutSamples = namedtuple('RolloutSamples', ['observations', 'actions', 'old_values', 'old_log_prob', 'advantages', 'returns'])
+
+
+def compute_gae(rewards, values, episode_starts, last_values, dones, gamma, gae_lambda, advantages=None):
+    """
+    Generalized advantage estimation over (n_steps, ...) arrays, same as the SB3 RolloutBuffer.
+    TD errors are computed for all steps at once, leaving only the discounted backward sum in the loop.
+    Returns (advantages, returns), writing advantages in place when given.
+    """
+    next_values = np.concatenate([values[1:], last_values[None]], axis=0)
+    next_non_terminal = 1.0 - np.concatenate([episode_starts[1:], dones[None]], axis=0)
+    deltas = rewards + gamma * next_values * next_non_terminal - values
+    decay = (gamma * gae_lambda) * next_non_terminal
+
+    if advantages is None:
+        advantages = np.empty_like(deltas)
+    last_gae_lam = np.zeros_like(deltas[0])
+    for step in reversed(range(deltas.shape[0])):
+        last_gae_lam = deltas[step] + decay[step] * last_gae_lam
+        advantages[step] = last_gae_lam
+    return advantages, advantages + values
+
+
+class Rollout:
+    """
+    Rollout storage of PPO, preallocated as float32 tensors of shape (n_steps, n_envs, ...).
+    Steps are copied in place. get() gathers the storage once in a random order,
+    and minibatches are contiguous slices (views) of that shuffled copy.
+    """
+    def __init__(self, n_steps, observation_shape, action_shape, n_envs, gamma=0.99, gae_lambda=0.95):
+        self.n_steps = n_steps
+        self.n_envs = n_envs
+        self.gamma = gamma
+        self.gae_lambda = gae_lambda
+
+        self.observations = torch.zeros((n_steps, n_envs, *observation_shape), dtype=torch.float32)
+        self.actions = torch.zeros((n_steps, n_envs, *action_shape), dtype=torch.float32)
+        self.rewards = torch.zeros((n_steps, n_envs), dtype=torch.float32)
+        self.episode_starts = torch.zeros((n_steps, n_envs), dtype=torch.float32)
+        self.values = torch.zeros((n_steps, n_envs), dtype=torch.float32)
+        self.log_probs = torch.zeros((n_steps, n_envs), dtype=torch.float32)
+        self.advantages = torch.zeros((n_steps, n_envs), dtype=torch.float32)
+        self.returns = torch.zeros((n_steps, n_envs), dtype=torch.float32)
+        # numpy views sharing memory with the tensors, to write steps without tensor conversions
+        self.arrays = [tensor.numpy() for tensor in
+            (self.observations, self.actions, self.rewards, self.episode_starts, self.values, self.log_probs)]
+        self.pos = 0
+
+    def reset(self):
+        self.pos = 0
+
+    def add(self, obs, actions, rewards, episode_starts, values, log_probs):
+        obs_buf, action_buf, reward_buf, start_buf, value_buf, log_prob_buf = self.arrays
+        pos = self.pos
+        obs_buf[pos] = np.reshape(obs, obs_buf.shape[1:])
+        action_buf[pos] = np.reshape(actions, action_buf.shape[1:])
+        reward_buf[pos] = rewards
+        start_buf[pos] = episode_starts
+        value_buf[pos] = values.numpy().reshape(-1)
+        log_prob_buf[pos] = log_probs.numpy().reshape(-1)
+        self.pos += 1
+
+    def compute_returns_and_advantage(self, last_values, dones):
+        _, returns = compute_gae(
+            self.rewards.numpy(), self.values.numpy(), self.episode_starts.numpy(),
+            last_values.flatten().numpy(), np.asarray(dones, dtype=np.float32),
+            self.gamma, self.gae_lambda, advantages=self.advantages.numpy())
+        self.returns.copy_(torch.from_numpy(returns))
+
+    def get(self, batch_size=None):
+        size = self.n_steps * self.n_envs
+        if batch_size is None:
+            batch_size = size
+
+        flat = [
+            self.observations.view(size, *self.observations.shape[2:]),
+            self.actions.view(size, *self.actions.shape[2:]),
+            self.values.view(size),
+            self.log_probs.view(size),
+            self.advantages.view(size),
+            self.returns.view(size),
+        ]
+        if batch_size >= size:
+            yield RolloutSamples(*flat)
+            return
+
+        indices = torch.from_numpy(np.random.permutation(size))
+        shuffled = [tensor[indices] for tensor in flat]
+        for start in range(0, size, batch_size):
+            yield RolloutSamples(*[tensor[start:start + batch_size] for tensor in shuffled])